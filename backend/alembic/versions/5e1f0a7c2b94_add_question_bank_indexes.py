@@ -0,0 +1,32 @@
+"""add_question_bank_indexes
+
+Revision ID: 5e1f0a7c2b94
+Revises: 3dc43815e37b
+Create Date: 2026-10-18 10:12:41.502317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1f0a7c2b94'
+down_revision: Union[str, None] = '3dc43815e37b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Indexes for reusing stored questions by language, difficulty and topics
+    op.create_index('ix_questions_language_difficulty_id', 'questions', ['programming_language', 'difficulty', 'id'])
+    op.create_index('ix_questions_topics', 'questions', ['topics'], postgresql_using='gin')
+    # Index for finding the questions a user has already been given
+    op.create_index('ix_user_solved_questions_user_id_question_id', 'user_solved_questions', ['user_id', 'question_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_solved_questions_user_id_question_id', table_name='user_solved_questions')
+    op.drop_index('ix_questions_topics', table_name='questions')
+    op.drop_index('ix_questions_language_difficulty_id', table_name='questions')
@@ -0,0 +1,33 @@
+"""add_feedback_job_status
+
+Revision ID: a81c3d5e7f20
+Revises: 5e1f0a7c2b94
+Create Date: 2026-10-18 11:03:17.284611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81c3d5e7f20'
+down_revision: Union[str, None] = '5e1f0a7c2b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Track background feedback generation for each submission
+    op.add_column('user_solved_questions', sa.Column('feedback_status', sa.String(), nullable=False, server_default='ready'))
+    op.add_column('user_solved_questions', sa.Column('feedback_attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user_solved_questions', sa.Column('feedback_error', sa.String(), nullable=True))
+    op.add_column('user_solved_questions', sa.Column('feedback_job_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('user_solved_questions', 'feedback_job_id')
+    op.drop_column('user_solved_questions', 'feedback_error')
+    op.drop_column('user_solved_questions', 'feedback_attempts')
+    op.drop_column('user_solved_questions', 'feedback_status')
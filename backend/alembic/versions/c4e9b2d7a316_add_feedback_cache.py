@@ -0,0 +1,42 @@
+"""add_feedback_cache
+
+Revision ID: c4e9b2d7a316
+Revises: a81c3d5e7f20
+Create Date: 2026-10-18 12:41:09.615204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9b2d7a316'
+down_revision: Union[str, None] = 'a81c3d5e7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Feedback reused for resubmissions of the same normalized code and test outcomes
+    op.create_table(
+        'feedback_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('programming_language', sa.String(), nullable=False),
+        sa.Column('feedback', sa.JSON(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_feedback_cache_created_at', 'feedback_cache', ['created_at'])
+    op.create_index('ix_feedback_cache_last_used_at', 'feedback_cache', ['last_used_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feedback_cache_last_used_at', table_name='feedback_cache')
+    op.drop_index('ix_feedback_cache_created_at', table_name='feedback_cache')
+    op.drop_table('feedback_cache')
@@ -0,0 +1,33 @@
+"""add_feedback_updated_at
+
+Revision ID: d7f3a9c1e5b8
+Revises: c4e9b2d7a316
+Create Date: 2026-10-18 16:02:44.118930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3a9c1e5b8'
+down_revision: Union[str, None] = 'c4e9b2d7a316'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Last time a feedback job touched the submission, so stale jobs can be claimed by another server process
+    op.add_column('user_solved_questions', sa.Column('feedback_updated_at', sa.DateTime(), nullable=False, server_default=sa.text("(now() at time zone 'utc')")))
+    op.create_index(
+        'ix_user_solved_questions_feedback_status_updated_at',
+        'user_solved_questions',
+        ['feedback_status', 'feedback_updated_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_solved_questions_feedback_status_updated_at', table_name='user_solved_questions')
+    op.drop_column('user_solved_questions', 'feedback_updated_at')
@@ -0,0 +1,329 @@
+"""
+Benchmark the code runner with canned OCaml, Java and C submissions.
+
+For every language and submission kind (trivial, CPU-heavy, output-heavy,
+timeout, compile error) it reports per-stage latency (write, compile, run,
+cleanup) and peak child memory. It then measures submission throughput at
+several concurrency levels, and how far the asyncio event loop lags while
+submissions run in worker threads, as they do under /api/run_tests.
+
+Everything runs locally; languages whose toolchain is not installed are
+skipped. The artifact cache and workspaces are redirected to a temporary
+directory, and sources get a unique comment, so every submission is compiled
+from scratch unless --warm-cache is given. Results are printed as JSON.
+
+Usage (from the backend directory):
+    python benchmarks/execution_benchmark.py [--output results.json] [--concurrency 1 4 16]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCHMARK_DIR = tempfile.mkdtemp(prefix="ai-practice-bench-")
+os.environ.setdefault("ARTIFACT_CACHE_DIR", os.path.join(BENCHMARK_DIR, "artifacts"))
+os.environ.setdefault("EXECUTION_WORKSPACE_ROOT", os.path.join(BENCHMARK_DIR, "workspaces"))
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from execution.runner import CodeRunner, CompilationError, ProgrammingLanguage, map_concurrently  # noqa: E402
+
+SUBMISSIONS = {
+    "ocaml": {
+        "comment": "(* {} *)",
+        "input_prefix": "ocaml main.ml ",
+        "trivial": "let () = print_endline (String.concat \" \" (List.tl (Array.to_list Sys.argv)))\n",
+        "cpu": (
+            "let () =\n"
+            "  let n = int_of_string Sys.argv.(1) in\n"
+            "  let s = ref 0 in\n"
+            "  for i = 1 to n do s := (!s + i * i) mod 1000007 done;\n"
+            "  print_int !s\n"
+        ),
+        "output": (
+            "let () =\n"
+            "  for i = 1 to int_of_string Sys.argv.(1) do Printf.printf \"line %d\\n\" i done\n"
+        ),
+        "timeout": "let rec loop n = loop (n + 1)\nlet () = loop 0\n",
+        "compile_error": "let () = print_int \"not an int\"\n",
+    },
+    "java": {
+        "comment": "// {}",
+        "input_prefix": "",
+        "trivial": (
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        System.out.println(String.join(\" \", args));\n"
+            "    }\n"
+            "}\n"
+        ),
+        "cpu": (
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        long n = Long.parseLong(args[0]), s = 0;\n"
+            "        for (long i = 1; i <= n; i++) s = (s + i * i) % 1000007;\n"
+            "        System.out.println(s);\n"
+            "    }\n"
+            "}\n"
+        ),
+        "output": (
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        int n = Integer.parseInt(args[0]);\n"
+            "        for (int i = 1; i <= n; i++) System.out.println(\"line \" + i);\n"
+            "    }\n"
+            "}\n"
+        ),
+        "timeout": (
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        long n = 0;\n"
+            "        while (true) n++;\n"
+            "    }\n"
+            "}\n"
+        ),
+        "compile_error": (
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        System.out.println(\"missing semicolon\")\n"
+            "    }\n"
+            "}\n"
+        ),
+    },
+    "c": {
+        "comment": "/* {} */",
+        "input_prefix": "./main ",
+        "trivial": (
+            "#include <stdio.h>\n"
+            "int main(int argc, char **argv) {\n"
+            "    for (int i = 1; i < argc; i++) printf(\"%s \", argv[i]);\n"
+            "    printf(\"\\n\");\n"
+            "    return 0;\n"
+            "}\n"
+        ),
+        "cpu": (
+            "#include <stdio.h>\n"
+            "#include <stdlib.h>\n"
+            "int main(int argc, char **argv) {\n"
+            "    long n = atol(argv[1]), s = 0;\n"
+            "    for (long i = 1; i <= n; i++) s = (s + i * i) % 1000007;\n"
+            "    printf(\"%ld\\n\", s);\n"
+            "    return 0;\n"
+            "}\n"
+        ),
+        "output": (
+            "#include <stdio.h>\n"
+            "#include <stdlib.h>\n"
+            "int main(int argc, char **argv) {\n"
+            "    int n = atoi(argv[1]);\n"
+            "    for (int i = 1; i <= n; i++) printf(\"line %d\\n\", i);\n"
+            "    return 0;\n"
+            "}\n"
+        ),
+        "timeout": "int main(void) {\n    volatile long n = 0;\n    for (;;) n++;\n}\n",
+        "compile_error": "int main(void) {\n    return undefined_variable;\n}\n",
+    },
+}
+
+# Program arguments for the four test cases of each submission kind
+ARGUMENTS = {
+    "trivial": ["1 2 3", "hello world", "a", "x y z"],
+    "cpu": ["20000000", "20000000", "20000000", "20000000"],
+    "output": ["200000", "200000", "200000", "200000"],
+    "timeout": ["1", "2", "3", "4"],
+    "compile_error": ["1", "2", "3", "4"],
+}
+
+TOOLCHAINS = {
+    "ocaml": ["ocaml"],
+    "java": ["javac", "java"],
+    "c": ["gcc"],
+}
+
+def available(language: str) -> bool:
+    return all(shutil.which(tool) for tool in TOOLCHAINS[language])
+
+def source(language: str, kind: str, warm_cache: bool) -> str:
+    code = SUBMISSIONS[language][kind]
+    if warm_cache:
+        return code
+    # A unique comment gives every submission its own artifact cache key
+    return code + "\n" + SUBMISSIONS[language]["comment"].format(uuid.uuid4()) + "\n"
+
+def inputs(language: str, kind: str) -> list:
+    return [SUBMISSIONS[language]["input_prefix"] + args for args in ARGUMENTS[kind]]
+
+def summarize(values: list) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        "mean": statistics.mean(values),
+        "p50": values[len(values) // 2],
+        "p95": values[max(int(len(values) * 0.95) - 1, 0)],
+        "max": values[-1],
+    }
+
+def run_submission(language: str, kind: str, timeout: float, warm_cache: bool) -> dict:
+    """Build and run one submission, recording stage timings and child peak memory."""
+    runner = CodeRunner(ProgrammingLanguage(language), source(language, kind, warm_cache), timeout=timeout)
+    record = {"compile_error": False, "timeouts": 0, "truncated": 0, "run_seconds": [], "max_rss_kb": None}
+    started = time.perf_counter()
+    try:
+        runner.prepare()
+    except CompilationError:
+        record["compile_error"] = True
+    record["prepare_seconds"] = time.perf_counter() - started
+
+    if not record["compile_error"]:
+        for input_args in inputs(language, kind):
+            run_started = time.perf_counter()
+            try:
+                process = runner.run(input_args)
+                record["truncated"] += int(process.truncated)
+                usage = process.usage
+            except subprocess.TimeoutExpired as e:
+                record["timeouts"] += 1
+                usage = getattr(e, "usage", None)
+            record["run_seconds"].append(time.perf_counter() - run_started)
+            if usage is not None and usage.max_rss_kb is not None:
+                record["max_rss_kb"] = max(record["max_rss_kb"] or 0, usage.max_rss_kb)
+
+    runner.cleanup()
+    record.update({f"{stage}_seconds": seconds for stage, seconds in runner.stage_times.items()})
+    if runner.compile_usage is not None and runner.compile_usage.max_rss_kb is not None:
+        record["compile_max_rss_kb"] = runner.compile_usage.max_rss_kb
+    return record
+
+def bench_stages(language: str, repeat: int, timeout: float, warm_cache: bool) -> dict:
+    results = {}
+    for kind in ARGUMENTS:
+        records = [run_submission(language, kind, timeout, warm_cache) for _ in range(repeat)]
+        results[kind] = {
+            "write": summarize([r["write_seconds"] for r in records if "write_seconds" in r]),
+            "compile": summarize([r["compile_seconds"] for r in records if "compile_seconds" in r]),
+            "prepare": summarize([r["prepare_seconds"] for r in records]),
+            "run": summarize([seconds for r in records for seconds in r["run_seconds"]]),
+            "cleanup": summarize([r["cleanup_seconds"] for r in records]),
+            "compile_error": records[0]["compile_error"],
+            "timeouts": sum(r["timeouts"] for r in records),
+            "truncated": sum(r["truncated"] for r in records),
+            # None when no run's peak memory could be measured
+            "peak_run_rss_kb": max((r["max_rss_kb"] for r in records if r["max_rss_kb"] is not None), default=None),
+            "peak_compile_rss_kb": max((r["compile_max_rss_kb"] for r in records if "compile_max_rss_kb" in r), default=None),
+        }
+    return results
+
+def full_submission(language: str, timeout: float, warm_cache: bool) -> float:
+    """What /api/run_tests does for one submission: build once, run all cases concurrently."""
+    started = time.perf_counter()
+    try:
+        with CodeRunner(ProgrammingLanguage(language), source(language, "trivial", warm_cache), timeout=timeout) as runner:
+            map_concurrently(runner.run, inputs(language, "trivial"))
+    except CompilationError:
+        pass
+    return time.perf_counter() - started
+
+def bench_throughput(language: str, concurrency: int, submissions: int, timeout: float, warm_cache: bool) -> dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: full_submission(language, timeout, warm_cache), range(submissions)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "submissions": submissions,
+        "elapsed_seconds": elapsed,
+        "submissions_per_second": submissions / elapsed,
+        "latency": summarize(latencies),
+    }
+
+async def measure_loop_lag(language: str, concurrency: int, timeout: float, warm_cache: bool) -> dict:
+    """Event-loop lag while `concurrency` CPU-heavy submissions run off the loop via asyncio.to_thread."""
+    def heavy():
+        try:
+            with CodeRunner(ProgrammingLanguage(language), source(language, "cpu", warm_cache), timeout=timeout) as runner:
+                map_concurrently(runner.run, inputs(language, "cpu"))
+        except CompilationError:
+            pass
+
+    tasks = [asyncio.create_task(asyncio.to_thread(heavy)) for _ in range(concurrency)]
+    lags = []
+    interval = 0.01
+    while not all(task.done() for task in tasks):
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    await asyncio.gather(*tasks)
+    return {"concurrency": concurrency, "samples": len(lags), "lag_seconds": summarize(lags)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--languages', nargs='+', default=list(SUBMISSIONS), choices=list(SUBMISSIONS))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--repeat', type=int, default=3, help="submissions per kind in the stage benchmark")
+    parser.add_argument('--submissions', type=int, default=32, help="submissions per throughput level")
+    parser.add_argument('--timeout', type=float, default=2.0, help="per-test-case timeout in seconds")
+    parser.add_argument('--warm-cache', action='store_true', help="reuse compiled artifacts across submissions")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "timeout": args.timeout,
+            "repeat": args.repeat,
+            "submissions": args.submissions,
+            "warm_cache": args.warm_cache,
+            "execution_workers": os.getenv("EXECUTION_WORKERS"),
+            "execution_max_processes": os.getenv("EXECUTION_MAX_PROCESSES"),
+        },
+        "languages": {},
+    }
+
+    try:
+        for language in args.languages:
+            if not available(language):
+                report["languages"][language] = {"skipped": "toolchain not installed"}
+                continue
+            print(f"Benchmarking {language}...", file=sys.stderr)
+            report["languages"][language] = {
+                "stages": bench_stages(language, args.repeat, args.timeout, args.warm_cache),
+                "throughput": [
+                    bench_throughput(language, level, args.submissions, args.timeout, args.warm_cache)
+                    for level in args.concurrency
+                ],
+                "event_loop_lag": asyncio.run(
+                    measure_loop_lag(language, max(args.concurrency), args.timeout, args.warm_cache)
+                ),
+            }
+    finally:
+        shutil.rmtree(BENCHMARK_DIR, ignore_errors=True)
+
+    report["peak_rss_kb"] = {
+        "benchmark_process": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "largest_child": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare cold-start Java execution (one `java` process per test case) with the
+warm JVM worker pool.
+
+Usage (from the backend directory):
+    python benchmarks/jvm_pool_benchmark.py [--runs 50] [--workers 2]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from execution.jvm_pool import JvmWorkerPool
+from execution import runner
+from execution.runner import CodeRunner, ProgrammingLanguage
+
+JAVA_CODE = """
+public class Main {
+    public static void main(String[] args) {
+        int sum = 0;
+        for (String arg : args) {
+            sum += Integer.parseInt(arg);
+        }
+        System.out.println("Sum: " + sum);
+    }
+}
+"""
+
+def time_runs(code_runner: CodeRunner, runs: int) -> list:
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        process = code_runner.run(f"{i} 1 2")
+        timings.append(time.perf_counter() - start)
+        assert process.stdout.strip() == f"Sum: {i + 3}", process
+    return timings
+
+def summarize(name: str, timings: list):
+    timings = sorted(timings)
+    print(
+        f"{name:>6}: mean {statistics.mean(timings) * 1000:8.1f} ms  "
+        f"p50 {timings[len(timings) // 2] * 1000:8.1f} ms  "
+        f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:8.1f} ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    with CodeRunner(ProgrammingLanguage.JAVA, JAVA_CODE) as code_runner:
+        runner.jvm_pool = JvmWorkerPool(size=0)
+        summarize("cold", time_runs(code_runner, args.runs))
+
+        pool = JvmWorkerPool(size=args.workers)
+        runner.jvm_pool = pool
+        code_runner.run("0")  # start a worker outside the measurement
+        summarize("warm", time_runs(code_runner, args.runs))
+        print(f"pool: {pool.stats()}")
+
+if __name__ == '__main__':
+    main()
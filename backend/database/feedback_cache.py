@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models import Feedback
+from .models import DBFeedbackCache
+
+# Bump when the feedback prompts change so stale feedback is no longer served
+FEEDBACK_CACHE_VERSION = "1"
+# Seconds a cached feedback is served after it was generated (0 disables the cache)
+FEEDBACK_CACHE_TTL = int(os.getenv("FEEDBACK_CACHE_TTL", 7 * 24 * 3600))
+# Most cached feedbacks kept; the least recently used are evicted beyond this
+FEEDBACK_CACHE_MAX_ENTRIES = int(os.getenv("FEEDBACK_CACHE_MAX_ENTRIES", 100000))
+# Stores between two eviction passes
+FEEDBACK_CACHE_EVICT_INTERVAL = 100
+
+_LINE_COMMENTS = {"java": "//", "c": "//"}
+_BLOCK_COMMENTS = {"java": ("/*", "*/"), "c": ("/*", "*/"), "ocaml": ("(*", "*)")}
+# OCaml comments nest; C and Java comments end at the first */
+_NESTED_COMMENTS = {"ocaml"}
+
+def _split_source(language: str, code: str) -> List[Tuple[bool, str]]:
+    """
+    Split source code into (is_literal, text) segments with comments replaced
+    by a space. String and character literals are kept verbatim, so comment
+    markers inside them are left alone.
+    """
+    line_comment = _LINE_COMMENTS.get(language)
+    block = _BLOCK_COMMENTS.get(language)
+    nested = language in _NESTED_COMMENTS
+    segments: List[Tuple[bool, str]] = []
+    start = i = 0
+    n = len(code)
+
+    def flush(end: int):
+        if end > start:
+            segments.append((False, code[start:end]))
+
+    while i < n:
+        c = code[i]
+        if line_comment and code.startswith(line_comment, i):
+            flush(i)
+            end = code.find("\n", i)
+            i = n if end == -1 else end
+            segments.append((False, " "))
+            start = i
+        elif block and code.startswith(block[0], i):
+            flush(i)
+            depth, i = 1, i + len(block[0])
+            while i < n and depth:
+                if code.startswith(block[1], i):
+                    depth -= 1
+                    i += len(block[1])
+                elif nested and code.startswith(block[0], i):
+                    depth += 1
+                    i += len(block[0])
+                else:
+                    i += 1
+            segments.append((False, " "))
+            start = i
+        elif c == '"' or (c == "'" and _is_char_literal(language, code, i)):
+            flush(i)
+            begin, i = i, i + 1
+            while i < n and code[i] != c:
+                i += 2 if code[i] == "\\" else 1
+            i = min(i + 1, n)
+            segments.append((True, code[begin:i]))
+            start = i
+        elif language == "ocaml" and code.startswith("{|", i):
+            flush(i)
+            begin = i
+            end = code.find("|}", i + 2)
+            i = n if end == -1 else end + 2
+            segments.append((True, code[begin:i]))
+            start = i
+        else:
+            i += 1
+    flush(n)
+    return segments
+
+def _is_char_literal(language: str, code: str, i: int) -> bool:
+    # In OCaml a quote also marks type variables ('a) and primed names (x'),
+    # so only 'c' and '\...' count as character literals there
+    if language != "ocaml":
+        return True
+    if code.startswith("\\", i + 1):
+        return True
+    return i + 2 < len(code) and code[i + 2] == "'"
+
+# Characters that combine into multi-character operators (`- -` is not `--`)
+_OPERATOR_CHARS = set("+-*/%<>=!&|^~.:?@#$")
+
+def _char_class(language: str, c: str) -> int:
+    """0 for word characters, 1 for operator characters, 2 for anything else."""
+    if c.isalnum() or c == "_" or (c == "'" and language == "ocaml"):
+        return 0
+    return 1 if c in _OPERATOR_CHARS else 2
+
+def _needs_space(language: str, before: str, after: str) -> bool:
+    kind = _char_class(language, before)
+    return kind != 2 and kind == _char_class(language, after)
+
+def normalize_source(language: str, code: str) -> str:
+    """
+    Source code without comments or insignificant whitespace. Whitespace is
+    collapsed to one space between two words or two operator characters
+    (`a - -b` must not become `a--b`) and dropped everywhere else. Literals are kept
+    as written. C preprocessor directives keep their spaces (`#define F (x)`
+    is not `#define F(x)`) and the line breaks that end them.
+    """
+    parts: List[str] = []
+    space = False
+    line_start = True
+    directive = False
+    for is_literal, text in _split_source(language, code):
+        pieces = [text] if is_literal else re.split(r"(\s+)", text)
+        for piece in pieces:
+            if not piece:
+                continue
+            if not is_literal and piece.isspace():
+                if "\n" in piece:
+                    line_start = True
+                    if directive:
+                        parts.append("\n")
+                        directive = parts[-2].endswith("\\")
+                        continue
+                space = True
+                continue
+            if language == "c" and line_start and piece.startswith("#"):
+                directive = True
+            if space and parts and parts[-1] != "\n" and (directive or _needs_space(language, parts[-1][-1], piece[0])):
+                parts.append(" ")
+            space = False
+            line_start = False
+            parts.append(piece)
+    return "".join(parts).strip()
+
+class FeedbackCache:
+    """
+    Feedback generated for past submissions, stored in the feedback_cache
+    table so resubmitting the same code (up to comments and whitespace) with
+    the same test outcomes skips the LLM. Entries are served for
+    FEEDBACK_CACHE_TTL seconds after they were generated; every
+    FEEDBACK_CACHE_EVICT_INTERVAL stores, expired entries and the least
+    recently used ones beyond FEEDBACK_CACHE_MAX_ENTRIES are deleted.
+    """
+
+    def __init__(self, ttl: int = FEEDBACK_CACHE_TTL, max_entries: int = FEEDBACK_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stores_since_eviction = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @staticmethod
+    def key(question_id: int, programming_language: str, code: str, passed: List[bool]) -> str:
+        normalized = normalize_source(programming_language, code)
+        payload = json.dumps([
+            FEEDBACK_CACHE_VERSION,
+            question_id,
+            programming_language,
+            hashlib.sha256(normalized.encode()).hexdigest(),
+            passed
+        ])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, db: Session, question_id: int, programming_language: str, code: str, passed: List[bool]) -> Optional[Feedback]:
+        """
+        The cached feedback for this submission, or None. A hit refreshes the
+        entry's last use; that change is committed with the caller's session.
+        """
+        if not self.enabled:
+            return None
+        entry = (
+            db.query(DBFeedbackCache)
+            .filter(
+                DBFeedbackCache.key == self.key(question_id, programming_language, code, passed),
+                DBFeedbackCache.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl)
+            )
+            .first()
+        )
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        entry.last_used_at = datetime.utcnow()
+        entry.hits += 1
+        return Feedback(**entry.feedback)
+
+    def put(self, db: Session, question_id: int, programming_language: str, code: str, passed: List[bool], feedback: Feedback):
+        """Store (or replace) the feedback for this submission and commit."""
+        if not self.enabled:
+            return
+        now = datetime.utcnow()
+        values = {
+            "key": self.key(question_id, programming_language, code, passed),
+            "question_id": question_id,
+            "programming_language": programming_language,
+            "feedback": feedback.dict(),
+            "created_at": now,
+            "last_used_at": now,
+            "hits": 0,
+        }
+        # Concurrent submissions of the same code may race to store it
+        statement = insert(DBFeedbackCache).values(**values)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[DBFeedbackCache.key],
+            set_={name: statement.excluded[name] for name in ("feedback", "created_at", "last_used_at", "hits")}
+        ))
+        db.commit()
+
+        with self._lock:
+            self.stores += 1
+            self._stores_since_eviction += 1
+            if self._stores_since_eviction < FEEDBACK_CACHE_EVICT_INTERVAL:
+                return
+            self._stores_since_eviction = 0
+        self.evict(db)
+
+    def evict(self, db: Session) -> int:
+        """Delete expired entries and the least recently used beyond max_entries. Returns how many went."""
+        expired = (
+            db.query(DBFeedbackCache)
+            .filter(DBFeedbackCache.created_at < datetime.utcnow() - timedelta(seconds=self.ttl))
+            .delete(synchronize_session=False)
+        )
+        overflow = 0
+        if db.query(func.count(DBFeedbackCache.key)).scalar() > self.max_entries:
+            keep = (
+                db.query(DBFeedbackCache.key)
+                .order_by(DBFeedbackCache.last_used_at.desc())
+                .limit(self.max_entries)
+            )
+            overflow = (
+                db.query(DBFeedbackCache)
+                .filter(~DBFeedbackCache.key.in_(keep))
+                .delete(synchronize_session=False)
+            )
+        db.commit()
+        with self._lock:
+            self.evictions += expired + overflow
+        return expired + overflow
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "ttl": self.ttl,
+                "max_entries": self.max_entries,
+            }
+
+feedback_cache = FeedbackCache()
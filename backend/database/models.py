@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime, ARRAY, Index, text
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 from sqlalchemy.ext.mutable import MutableDict
@@ -32,6 +32,12 @@ class DBQuestion(Base):
     
     solved_by = relationship("DBUserSolvedQuestion", back_populates="question")
 
+    __table_args__ = (
+        # Question bank lookups (see database/question_bank.py)
+        Index("ix_questions_language_difficulty_id", "programming_language", "difficulty", "id"),
+        Index("ix_questions_topics", "topics", postgresql_using="gin"),
+    )
+
 class DBUserSolvedQuestion(Base):
     __tablename__ = "user_solved_questions"
     
@@ -42,7 +48,39 @@ class DBUserSolvedQuestion(Base):
     test_results = Column(JSON, nullable=False)  # Store test results as JSON
     is_correct = Column(Boolean, nullable=False)
     feedback = Column(JSON, nullable=False)  # Store AI feedback as JSON
+    # Feedback is generated in the background: pending, running, ready or failed
+    feedback_status = Column(String, nullable=False, default="ready", server_default="ready")
+    feedback_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    feedback_error = Column(String)
+    # Identifies the job allowed to write the feedback of the latest submission
+    feedback_job_id = Column(String)
+    # Touched by every change to the row, so a pending or running job left
+    # untouched for long has lost its server process (see claim_stale_feedback_jobs)
+    feedback_updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=text("(now() at time zone 'utc')"))
     solved_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("DBUser", back_populates="solved_questions")
-    question = relationship("DBQuestion", back_populates="solved_by") 
\ No newline at end of file
+    question = relationship("DBQuestion", back_populates="solved_by")
+
+    __table_args__ = (
+        Index("ix_user_solved_questions_user_id_question_id", "user_id", "question_id"),
+        Index("ix_user_solved_questions_feedback_status_updated_at", "feedback_status", "feedback_updated_at"),
+    )
+
+class DBFeedbackCache(Base):
+    __tablename__ = "feedback_cache"
+
+    # sha256 of the question, language, normalized code and per-test pass/fail (see database/feedback_cache.py)
+    key = Column(String(64), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    programming_language = Column(String, nullable=False)
+    feedback = Column(JSON, nullable=False)
+    hits = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Expiry and least-recently-used eviction
+        Index("ix_feedback_cache_created_at", "created_at"),
+        Index("ix_feedback_cache_last_used_at", "last_used_at"),
+    )
@@ -0,0 +1,57 @@
+import os
+import random
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from .models import DBQuestion, DBUserSolvedQuestion
+
+# Share of /api/generate_question requests that try to reuse a stored question
+# before generating a new one (0 always generates, 1 always tries the bank first)
+QUESTION_REUSE_RATIO = float(os.getenv("QUESTION_REUSE_RATIO", 0.5))
+# Most recent matching questions considered per lookup, so the query stays an
+# index range scan however large the table grows
+QUESTION_REUSE_CANDIDATES = int(os.getenv("QUESTION_REUSE_CANDIDATES", 50))
+
+def find_reusable_question(
+    db: Session,
+    user_id: int,
+    programming_language: str,
+    difficulty: str,
+    topics: Iterable[str],
+    avoid_names: Iterable[str]
+) -> Optional[DBQuestion]:
+    """
+    Pick a stored question in the same language and difficulty that shares
+    at least one topic and that the user has never been given. Questions with
+    performance test cases are skipped, since those were generated on request.
+    Served by the (programming_language, difficulty, id) and GIN(topics)
+    indexes on questions and the (user_id, question_id) index on attempts.
+    """
+    attempted = (
+        db.query(DBUserSolvedQuestion.question_id)
+        .filter(DBUserSolvedQuestion.user_id == user_id)
+    )
+    candidates = (
+        db.query(DBQuestion)
+        .filter(
+            DBQuestion.programming_language == programming_language,
+            DBQuestion.difficulty == difficulty,
+            DBQuestion.topics.overlap(list(topics)),
+            ~DBQuestion.id.in_(attempted)
+        )
+        .order_by(DBQuestion.id.desc())
+        .limit(QUESTION_REUSE_CANDIDATES)
+        .all()
+    )
+
+    avoid = {name.strip().lower() for name in avoid_names}
+    candidates = [
+        q for q in candidates
+        if q.name.strip().lower() not in avoid
+        and not any(tc.get("performance") for tc in q.test_cases)
+    ]
+    return random.choice(candidates) if candidates else None
+
+def should_reuse() -> bool:
+    return random.random() < QUESTION_REUSE_RATIO
@@ -0,0 +1,84 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Question, TestCase
+from .models import DBQuestion
+
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", 1024))
+
+class QuestionCache:
+    """
+    In-process LRU cache of questions by id, so run and submit requests can
+    refer to a question without uploading it. Holds validated `Question`
+    snapshots rather than ORM rows, which are tied to the session that loaded
+    them. Entries are invalidated whenever a DBQuestion is updated or deleted
+    through SQLAlchemy (see the mapper events below).
+    """
+
+    def __init__(self, max_entries: int = QUESTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Question]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, question_id: int) -> Optional[Question]:
+        """Return the question, loading it from the database on a miss. None if it does not exist."""
+        with self._lock:
+            question = self._entries.get(question_id)
+            if question is not None:
+                self._entries.move_to_end(question_id)
+                self.hits += 1
+                return question
+            self.misses += 1
+
+        db_question = db.query(DBQuestion).filter(DBQuestion.id == question_id).first()
+        if db_question is None:
+            return None
+        question = to_question(db_question)
+        self.put(question)
+        return question
+
+    def put(self, question: Question):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[question.id] = question
+            self._entries.move_to_end(question.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, question_id: int):
+        with self._lock:
+            self._entries.pop(question_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+def to_question(db_question: DBQuestion) -> Question:
+    return Question(
+        id=db_question.id,
+        name=db_question.name,
+        text=db_question.text,
+        testCases=[TestCase(**tc) for tc in db_question.test_cases],
+        hint=db_question.hint,
+        programming_language=db_question.programming_language
+    )
+
+question_cache = QuestionCache()
+
+@event.listens_for(DBQuestion, "after_update")
+@event.listens_for(DBQuestion, "after_delete")
+def _invalidate_question(mapper, connection, target: DBQuestion):
+    question_cache.invalidate(target.id)
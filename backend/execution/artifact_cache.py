@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+ARTIFACT_CACHE_DIR = os.getenv(
+    "ARTIFACT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "ai-practice-artifacts")
+)
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+META_FILE = "meta.json"
+STAGING_PREFIX = ".staging-"
+
+@dataclass
+class Artifact:
+    key: str
+    path: str
+    ok: bool
+    stderr: str
+
+class ArtifactCache:
+    """
+    On-disk, content-addressed cache of compiled submissions. Each entry is a
+    directory named after the hash of (language, compile command, source) that
+    holds the source, the compiler output and a meta.json recording whether the
+    build succeeded and the compiler's stderr, so compile failures are cached
+    as well. Entries are evicted least-recently-used once the total size
+    exceeds `max_bytes`; entries in use by a running submission are pinned.
+    """
+
+    def __init__(self, root: str = ARTIFACT_CACHE_DIR, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size in bytes, LRU order
+        self._pins: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(language: str, command: List[str], code: str) -> str:
+        payload = json.dumps([language, command, hashlib.sha256(code.encode()).hexdigest()])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def acquire(self, key: str, build: Callable[[str], Tuple[bool, str]]) -> Artifact:
+        """
+        Return the artifact for `key`, building it with `build(directory)` on a
+        miss. `build` must return (succeeded, stderr); both outcomes are cached.
+        Failures that say nothing about the source (e.g. a compile timeout)
+        should be raised instead, so nothing is stored. The returned artifact
+        is pinned until `release` is called.
+        """
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests for the same source wait for a single build
+        with build_lock:
+            with self._lock:
+                artifact = self._get(key)
+                if artifact:
+                    self.hits += 1
+                    self._pins[key] = self._pins.get(key, 0) + 1
+                    self._build_locks.pop(key, None)
+                    return artifact
+                self.misses += 1
+
+            staging = os.path.join(self.root, f"{STAGING_PREFIX}{uuid.uuid4()}")
+            os.makedirs(staging)
+            try:
+                ok, stderr = build(staging)
+                with open(os.path.join(staging, META_FILE), "w") as f:
+                    json.dump({"ok": ok, "stderr": stderr}, f)
+                path = self._path(key)
+                try:
+                    os.rename(staging, path)
+                except OSError:
+                    # Another server process built the same entry first
+                    if not os.path.isfile(os.path.join(path, META_FILE)):
+                        raise
+                    shutil.rmtree(staging, ignore_errors=True)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+            with self._lock:
+                self._entries[key] = _dir_size(path)
+                self._pins[key] = self._pins.get(key, 0) + 1
+                self._build_locks.pop(key, None)
+                self._evict()
+                return Artifact(key=key, path=path, ok=ok, stderr=stderr)
+
+    def release(self, artifact: Artifact):
+        with self._lock:
+            remaining = self._pins.get(artifact.key, 0) - 1
+            if remaining > 0:
+                self._pins[artifact.key] = remaining
+            else:
+                self._pins.pop(artifact.key, None)
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": sum(self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _get(self, key: str):
+        if key not in self._entries:
+            return None
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            # Entry was removed or corrupted behind our back
+            self._entries.pop(key, None)
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        self._entries.move_to_end(key)
+        try:
+            # Record the access on disk so LRU order survives restarts
+            os.utime(path)
+        except OSError:
+            pass
+        return Artifact(key=key, path=path, ok=meta["ok"], stderr=meta["stderr"])
+
+    def _evict(self):
+        total = sum(self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            total -= self._entries.pop(key)
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            self.evictions += 1
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(STAGING_PREFIX):
+                # Left behind by a build that was interrupted
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.isfile(os.path.join(path, META_FILE)):
+                entries.append((os.path.getmtime(path), name, _dir_size(path)))
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+        self._evict()
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+artifact_cache = ArtifactCache()
@@ -0,0 +1,105 @@
+#define _GNU_SOURCE
+#include <errno.h>
+#include <fcntl.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/time.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+/*
+ * Starts one program for execution/process.py:
+ *
+ *   launcher <report fd> <cpu seconds> <data bytes> <path> <argv0> [args...]
+ *
+ * The program runs in a forked child that sets RLIMIT_CPU (soft limit
+ * <cpu seconds>, SIGKILL one second later) and RLIMIT_DATA before it execs
+ * <path>, so the limits hold from the program's first instruction; "-" leaves
+ * a limit unset. Because the child is forked from this small process rather
+ * than from the server, the wait4 usage below is the program's own: Linux
+ * carries the parent's peak resident memory over to a child across exec.
+ *
+ * Report written to <report fd>:
+ *   "PID <pid>\n" once the child exists
+ *   "ERROR <errno>\n" if the exec failed, or
+ *   "DONE <status> <user us> <system us> <max rss kb>\n" once it has exited,
+ *   where status is the exit code, or minus the signal that killed it
+ */
+
+static long long micros(struct timeval tv) {
+    return (long long)tv.tv_sec * 1000000 + tv.tv_usec;
+}
+
+static int set_limit(int resource, const char *value, rlim_t extra) {
+    if (strcmp(value, "-") == 0) {
+        return 0;
+    }
+    rlim_t soft = strtoull(value, NULL, 10);
+    struct rlimit limit = { soft, soft + extra };
+    return setrlimit(resource, &limit);
+}
+
+int main(int argc, char **argv) {
+    if (argc < 6) {
+        fprintf(stderr, "usage: launcher <report fd> <cpu seconds> <data bytes> <path> <argv0> [args...]\n");
+        return 2;
+    }
+    int report = atoi(argv[1]);
+    FILE *out = fdopen(report, "w");
+
+    /* Carries the exec errno back from the child; closed by a successful exec */
+    int exec_errors[2];
+    if (out == NULL || pipe2(exec_errors, O_CLOEXEC) != 0) {
+        return 2;
+    }
+
+    pid_t pid = fork();
+    if (pid < 0) {
+        fprintf(out, "ERROR %d\n", errno);
+        return 2;
+    }
+    if (pid == 0) {
+        close(report);
+        close(exec_errors[0]);
+        if (set_limit(RLIMIT_CPU, argv[2], 1) == 0 && set_limit(RLIMIT_DATA, argv[3], 0) == 0) {
+            execvp(argv[4], argv + 5);
+        }
+        int error = errno;
+        (void)!write(exec_errors[1], &error, sizeof error);
+        _exit(127);
+    }
+
+    close(exec_errors[1]);
+    /* Only the program keeps the server's pipes, so they close when it exits */
+    int devnull = open("/dev/null", O_RDWR);
+    dup2(devnull, STDIN_FILENO);
+    dup2(devnull, STDOUT_FILENO);
+    dup2(devnull, STDERR_FILENO);
+
+    fprintf(out, "PID %d\n", (int)pid);
+    fflush(out);
+
+    int error;
+    ssize_t got;
+    do {
+        got = read(exec_errors[0], &error, sizeof error);
+    } while (got < 0 && errno == EINTR);
+
+    int status;
+    struct rusage usage;
+    while (wait4(pid, &status, 0, &usage) < 0) {
+        if (errno != EINTR) {
+            return 2;
+        }
+    }
+    if (got == sizeof error) {
+        fprintf(out, "ERROR %d\n", error);
+        return 1;
+    }
+    int code = WIFSIGNALED(status) ? -WTERMSIG(status) : WEXITSTATUS(status);
+    fprintf(out, "DONE %d %lld %lld %ld\n", code, micros(usage.ru_utime), micros(usage.ru_stime), usage.ru_maxrss);
+    return 0;
+}
@@ -0,0 +1,429 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.management.ManagementFactory;
+import java.lang.management.ThreadMXBean;
+import java.lang.reflect.Array;
+import java.lang.reflect.Field;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.lang.reflect.Modifier;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collection;
+import java.util.HashSet;
+import java.util.IdentityHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Set;
+
+/**
+ * Runs compiled student submissions inside an existing JVM so test cases do
+ * not each pay JVM startup. Two modes share the same per-run machinery:
+ *
+ * Worker mode (`java JvmWorker`), used by execution/jvm_pool.py:
+ *   worker -> "READY <guarded>\n" once started
+ *   server -> "<class directory>\t<max output bytes>\t<arg1>\t<arg2>...\n"
+ *   worker -> "DONE <exit status> <stdout bytes> <stderr bytes> <clean> <truncated> <user ns> <system ns>\n"
+ *             followed by the raw stdout bytes and stderr bytes of the run
+ *   Each request loads Main in a fresh class loader so static state never
+ *   leaks between runs. clean is 0 when the run left threads behind or
+ *   otherwise disturbed the worker, in which case the server retires it.
+ *
+ * Batch mode (`java JvmWorker --batch <class directory> <max output bytes>`),
+ * used by execution/java_batch.py to grade a whole question in one process:
+ *   server -> one line per test case, "<arg1>\t<arg2>...", then end of input
+ *   harness -> "UNSUPPORTED\n" if Main cannot be batched (its initialisation
+ *              printed or failed), otherwise for every test case
+ *              "CASE <exit status> <stdout bytes> <stderr bytes> <truncated> <user ns> <system ns>\n"
+ *              followed by the raw output, then "END\n" after the last one.
+ *   Main is loaded once. If a test case changes static state (or leaves
+ *   threads behind), "CONTAMINATED\n" follows its result and the harness
+ *   stops; the server runs the remaining test cases in separate processes.
+ *
+ * truncated is 1 when the program was stopped for exceeding the output cap.
+ * The CPU times are those of the thread that ran main.
+ */
+public class JvmWorker {
+
+    static class ExitRequest extends Error {
+        final int status;
+
+        ExitRequest(int status) {
+            super("System.exit(" + status + ")", null, false, false);
+            this.status = status;
+        }
+    }
+
+    static class OutputLimitExceeded extends Error {
+        OutputLimitExceeded() {
+            super("Output limit exceeded", null, false, false);
+        }
+    }
+
+    /** Shared byte budget for a run's stdout and stderr. */
+    static class OutputBudget {
+        long remaining;
+        boolean exceeded;
+
+        OutputBudget(long limit) {
+            remaining = limit;
+        }
+    }
+
+    static class BoundedOutputStream extends OutputStream {
+        private final ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+        private final OutputBudget budget;
+
+        BoundedOutputStream(OutputBudget budget) {
+            this.budget = budget;
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            write(new byte[] { (byte) b }, 0, 1);
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            synchronized (budget) {
+                int allowed = (int) Math.min(len, Math.max(budget.remaining, 0));
+                buffer.write(b, off, allowed);
+                budget.remaining -= len;
+                if (budget.remaining < 0) {
+                    budget.exceeded = true;
+                    // Stop the program, as the server kills a cold process that prints too much
+                    throw new OutputLimitExceeded();
+                }
+            }
+        }
+
+        synchronized byte[] toByteArray() {
+            return buffer.toByteArray();
+        }
+    }
+
+    static class ExitGuard extends SecurityManager {
+        @Override
+        public void checkExit(int status) {
+            throw new ExitRequest(status);
+        }
+
+        @Override
+        public void checkPermission(Permission perm) {
+        }
+
+        @Override
+        public void checkPermission(Permission perm, Object context) {
+        }
+    }
+
+    /** Result of running main once. */
+    static class Outcome {
+        int status;
+        boolean clean = true;
+        boolean truncated;
+        byte[] stdout;
+        byte[] stderr;
+        long userNanos;
+        long systemNanos;
+    }
+
+    public static void main(String[] args) throws Exception {
+        OutputStream protocolOut = new FileOutputStream(FileDescriptor.out);
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        System.setIn(new ByteArrayInputStream(new byte[0]));
+        boolean guarded = installExitGuard();
+
+        if (args.length == 3 && args[0].equals("--batch")) {
+            runBatch(args[1], Long.parseLong(args[2]), requests, protocolOut);
+            return;
+        }
+
+        writeLine(protocolOut, "READY " + (guarded ? 1 : 0));
+        String line;
+        while ((line = requests.readLine()) != null) {
+            String[] fields = line.split("\t", -1);
+            String[] programArgs = Arrays.copyOfRange(fields, 2, fields.length);
+            Outcome outcome;
+            try (URLClassLoader loader = loaderFor(fields[0])) {
+                outcome = runMain(() -> Class.forName("Main", true, loader).getMethod("main", String[].class),
+                        programArgs, Long.parseLong(fields[1]));
+            }
+            writeLine(protocolOut, "DONE " + outcome.status + " " + outcome.stdout.length + " "
+                    + outcome.stderr.length + " " + (outcome.clean ? 1 : 0) + " " + (outcome.truncated ? 1 : 0)
+                    + " " + outcome.userNanos + " " + outcome.systemNanos);
+            writeOutput(protocolOut, outcome);
+        }
+    }
+
+    private static void runBatch(String classDir, long maxOutputBytes, BufferedReader requests,
+            OutputStream protocolOut) throws Exception {
+        URLClassLoader loader = loaderFor(classDir);
+        List<Class<?>> studentClasses = new ArrayList<>();
+        Outcome init = runMain(() -> {
+            // Initialise every class up front so static initialisers run before the baseline snapshot
+            for (String name : classNames(new File(classDir), "")) {
+                studentClasses.add(Class.forName(name, true, loader));
+            }
+            return Class.forName("Main", true, loader).getMethod("main", String[].class);
+        }, null, maxOutputBytes);
+        if (init.status != 0 || init.stdout.length > 0 || init.stderr.length > 0 || !init.clean) {
+            // In separate processes the initialiser's output would appear in every test case
+            writeLine(protocolOut, "UNSUPPORTED");
+            return;
+        }
+        Method mainMethod = Class.forName("Main", true, loader).getMethod("main", String[].class);
+        String baseline = staticState(studentClasses);
+
+        String line;
+        while ((line = requests.readLine()) != null) {
+            String[] programArgs = line.isEmpty() ? new String[0] : line.split("\t", -1);
+            Outcome outcome = runMain(() -> mainMethod, programArgs, maxOutputBytes);
+            writeLine(protocolOut, "CASE " + outcome.status + " " + outcome.stdout.length + " "
+                    + outcome.stderr.length + " " + (outcome.truncated ? 1 : 0) + " " + outcome.userNanos + " "
+                    + outcome.systemNanos);
+            writeOutput(protocolOut, outcome);
+            if (!outcome.clean || !staticState(studentClasses).equals(baseline)) {
+                writeLine(protocolOut, "CONTAMINATED");
+                return;
+            }
+        }
+        writeLine(protocolOut, "END");
+    }
+
+    interface MainLookup {
+        Method find() throws Exception;
+    }
+
+    /**
+     * Run main with stdout/stderr captured under a shared byte budget. With
+     * null args only the lookup runs, which captures class initialisation.
+     */
+    private static Outcome runMain(MainLookup lookup, String[] programArgs, long maxOutputBytes) throws Exception {
+        PrintStream originalOut = System.out;
+        PrintStream originalErr = System.err;
+        OutputBudget budget = new OutputBudget(maxOutputBytes);
+        BoundedOutputStream stdout = new BoundedOutputStream(budget);
+        BoundedOutputStream stderr = new BoundedOutputStream(budget);
+        Set<Thread> threadsBefore = new HashSet<>(Thread.getAllStackTraces().keySet());
+        ThreadMXBean threadBean = ManagementFactory.getThreadMXBean();
+        long userBefore = threadBean.getCurrentThreadUserTime();
+        long cpuBefore = threadBean.getCurrentThreadCpuTime();
+        Outcome outcome = new Outcome();
+
+        System.setOut(new PrintStream(stdout, true, "UTF-8"));
+        System.setErr(new PrintStream(stderr, true, "UTF-8"));
+        try {
+            Method mainMethod = lookup.find();
+            if (programArgs != null) {
+                try {
+                    mainMethod.invoke(null, (Object) programArgs);
+                } catch (InvocationTargetException e) {
+                    outcome.status = report(e.getCause());
+                }
+            }
+            // Like a normal JVM, wait for non-daemon threads the program started
+            for (Thread thread : newThreads(threadsBefore)) {
+                if (!thread.isDaemon()) {
+                    thread.join();
+                }
+            }
+            outcome.clean = newThreads(threadsBefore).isEmpty();
+        } catch (ExitRequest e) {
+            outcome.status = e.status;
+            outcome.clean = newThreads(threadsBefore).isEmpty();
+        } catch (Throwable t) {
+            outcome.status = report(t);
+            outcome.clean = false;
+        } finally {
+            try {
+                System.out.flush();
+                System.err.flush();
+            } catch (OutputLimitExceeded e) {
+                // Already recorded in the budget
+            }
+            System.setOut(originalOut);
+            System.setErr(originalErr);
+        }
+
+        outcome.userNanos = threadBean.getCurrentThreadUserTime() - userBefore;
+        outcome.systemNanos = Math.max(threadBean.getCurrentThreadCpuTime() - cpuBefore - outcome.userNanos, 0);
+        if (budget.exceeded) {
+            // The program was interrupted mid-run and may have left threads or locks behind
+            outcome.status = 137;
+            outcome.clean = false;
+            outcome.truncated = true;
+        }
+        outcome.stdout = stdout.toByteArray();
+        outcome.stderr = stderr.toByteArray();
+        return outcome;
+    }
+
+    private static boolean installExitGuard() {
+        try {
+            System.setSecurityManager(new ExitGuard());
+            return true;
+        } catch (UnsupportedOperationException | SecurityException e) {
+            // Without the guard a System.exit() ends the JVM; the server then
+            // falls back to a cold run for the affected test cases.
+            return false;
+        }
+    }
+
+    private static URLClassLoader loaderFor(String classDir) throws Exception {
+        URL[] classPath = { new File(classDir).toURI().toURL() };
+        return new URLClassLoader(classPath, ClassLoader.getPlatformClassLoader());
+    }
+
+    private static List<String> classNames(File directory, String packagePrefix) {
+        List<String> names = new ArrayList<>();
+        File[] files = directory.listFiles();
+        if (files == null) {
+            return names;
+        }
+        Arrays.sort(files);
+        for (File file : files) {
+            String name = file.getName();
+            if (file.isDirectory()) {
+                names.addAll(classNames(file, packagePrefix + name + "."));
+            } else if (name.endsWith(".class")) {
+                names.add(packagePrefix + name.substring(0, name.length() - ".class".length()));
+            }
+        }
+        return names;
+    }
+
+    /** Fingerprint of every static field reachable from the student's classes. */
+    private static String staticState(List<Class<?>> classes) {
+        StringBuilder state = new StringBuilder();
+        Map<Object, Boolean> visited = new IdentityHashMap<>();
+        for (Class<?> cls : classes) {
+            for (Field field : cls.getDeclaredFields()) {
+                if (!Modifier.isStatic(field.getModifiers()) || field.isSynthetic()) {
+                    continue;
+                }
+                state.append(cls.getName()).append('.').append(field.getName()).append('=');
+                try {
+                    field.setAccessible(true);
+                    fingerprint(field.get(null), cls.getClassLoader(), visited, 0, state);
+                } catch (Exception e) {
+                    state.append("?");
+                }
+                state.append(';');
+            }
+        }
+        return state.toString();
+    }
+
+    private static final int MAX_FINGERPRINT_DEPTH = 6;
+
+    private static void fingerprint(Object value, ClassLoader studentLoader, Map<Object, Boolean> visited,
+            int depth, StringBuilder state) throws Exception {
+        if (value == null || value instanceof Number || value instanceof CharSequence || value instanceof Boolean
+                || value instanceof Character || value instanceof Enum) {
+            state.append(value);
+            return;
+        }
+        if (depth > MAX_FINGERPRINT_DEPTH || visited.put(value, Boolean.TRUE) != null) {
+            state.append('@').append(System.identityHashCode(value));
+            return;
+        }
+        Class<?> cls = value.getClass();
+        if (cls.isArray()) {
+            state.append('[');
+            for (int i = 0; i < Array.getLength(value); i++) {
+                fingerprint(Array.get(value, i), studentLoader, visited, depth + 1, state);
+                state.append(',');
+            }
+            state.append(']');
+        } else if (value instanceof Map) {
+            state.append('{');
+            for (Map.Entry<?, ?> entry : ((Map<?, ?>) value).entrySet()) {
+                fingerprint(entry.getKey(), studentLoader, visited, depth + 1, state);
+                state.append(':');
+                fingerprint(entry.getValue(), studentLoader, visited, depth + 1, state);
+                state.append(',');
+            }
+            state.append('}');
+        } else if (value instanceof Collection) {
+            state.append('(');
+            for (Object element : (Collection<?>) value) {
+                fingerprint(element, studentLoader, visited, depth + 1, state);
+                state.append(',');
+            }
+            state.append(')');
+        } else if (cls.getClassLoader() == studentLoader) {
+            // The student's own objects: compare their fields, including inherited ones
+            state.append(cls.getName()).append('<');
+            for (Class<?> c = cls; c != null && c.getClassLoader() == studentLoader; c = c.getSuperclass()) {
+                for (Field field : c.getDeclaredFields()) {
+                    if (Modifier.isStatic(field.getModifiers())) {
+                        continue;
+                    }
+                    field.setAccessible(true);
+                    fingerprint(field.get(value), studentLoader, visited, depth + 1, state);
+                    state.append(',');
+                }
+            }
+            state.append('>');
+        } else {
+            // Other library objects: identity is the best we can do without deep access
+            state.append(cls.getName()).append('@').append(System.identityHashCode(value));
+        }
+    }
+
+    private static int report(Throwable t) {
+        if (t instanceof ExitRequest) {
+            return ((ExitRequest) t).status;
+        }
+        if (t instanceof OutputLimitExceeded) {
+            return 137;
+        }
+        // Match the JVM's own report for an uncaught exception, without the worker's frames
+        List<StackTraceElement> frames = new ArrayList<>();
+        for (StackTraceElement frame : t.getStackTrace()) {
+            String className = frame.getClassName();
+            if (className.startsWith("jdk.internal.reflect.") || className.startsWith("java.lang.reflect.")
+                    || className.startsWith("JvmWorker")) {
+                break;
+            }
+            frames.add(frame);
+        }
+        t.setStackTrace(frames.toArray(new StackTraceElement[0]));
+        System.err.print("Exception in thread \"main\" ");
+        t.printStackTrace(System.err);
+        return 1;
+    }
+
+    private static List<Thread> newThreads(Set<Thread> before) {
+        List<Thread> threads = new ArrayList<>();
+        for (Thread thread : Thread.getAllStackTraces().keySet()) {
+            if (!before.contains(thread) && thread.isAlive()) {
+                threads.add(thread);
+            }
+        }
+        return threads;
+    }
+
+    private static void writeLine(OutputStream protocolOut, String line) throws Exception {
+        protocolOut.write((line + "\n").getBytes(StandardCharsets.UTF_8));
+        protocolOut.flush();
+    }
+
+    private static void writeOutput(OutputStream protocolOut, Outcome outcome) throws Exception {
+        protocolOut.write(outcome.stdout);
+        protocolOut.write(outcome.stderr);
+        protocolOut.flush();
+    }
+}
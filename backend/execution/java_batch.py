@@ -0,0 +1,122 @@
+import os
+import select
+import subprocess
+import time
+from typing import List, Optional, Union
+
+from .jvm_pool import JAVA_WORKER_OPTS, jvm_pool
+from .process import EXECUTION_MAX_OUTPUT_BYTES, ProcessResult, Usage
+
+# Grade whole Java questions in one JVM (ignored while the warm worker pool is
+# enabled). Off by default: the test cases then share the student's static
+# state, and the contamination check only compares library objects held in
+# statics by identity, so e.g. a static Random seeded once can change later
+# cases' output unnoticed. When off, every test case runs in its own JVM.
+JAVA_BATCH_HARNESS = os.getenv("JAVA_BATCH_HARNESS", "false").lower() in ("1", "true", "yes")
+
+BatchOutcome = Union[ProcessResult, subprocess.TimeoutExpired, None]
+
+def batch_enabled() -> bool:
+    return JAVA_BATCH_HARNESS and not jvm_pool.enabled
+
+def run_batch(
+    class_dir: str,
+    arg_vectors: List[List[str]],
+    timeout: float,
+    max_output_bytes: int = EXECUTION_MAX_OUTPUT_BYTES,
+    jvm_options: Optional[List[str]] = None
+) -> List[BatchOutcome]:
+    """
+    Run compiled `Main` from `class_dir` once per argument vector inside a
+    single JVM using the batch mode of JvmWorker.java. Returns one outcome
+    per vector: a ProcessResult, a TimeoutExpired for the case that ran out
+    of time, or None for cases the harness did not run (static state was
+    contaminated, a case timed out, or the harness could not be used); the
+    caller runs those in separate processes.
+    """
+    outcomes: List[BatchOutcome] = [None] * len(arg_vectors)
+    try:
+        classpath = jvm_pool.worker_classpath()
+    except Exception as e:
+        print(f"Java batch harness unavailable: {e}")
+        return outcomes
+
+    command = ['java'] + JAVA_WORKER_OPTS + (jvm_options or []) + [
+        '-cp', classpath, 'JvmWorker', '--batch', class_dir, str(max_output_bytes)
+    ]
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    reader = _Reader(process)
+    try:
+        process.stdin.write(''.join('\t'.join(args) + '\n' for args in arg_vectors).encode())
+        process.stdin.close()
+
+        # JVM startup and class initialisation count against the first case
+        for index, args in enumerate(arg_vectors):
+            started = time.monotonic()
+            header = reader.line(started + timeout).split()
+            if header[:1] != ['CASE']:
+                # UNSUPPORTED, CONTAMINATED by the previous case, or the JVM
+                # exited (e.g. System.exit without a guard)
+                break
+            status, out_length, err_length, truncated, user_ns, system_ns = (int(field) for field in header[1:])
+            deadline = started + timeout
+            stdout = reader.exactly(out_length, deadline)
+            stderr = reader.exactly(err_length, deadline)
+            outcomes[index] = ProcessResult(
+                ['java', '-cp', class_dir, 'Main'] + args,
+                status,
+                stdout=stdout.decode(errors='replace'),
+                stderr=stderr.decode(errors='replace'),
+                truncated=bool(truncated),
+                usage=Usage(
+                    wall_time=time.monotonic() - started,
+                    user_time=user_ns / 1e9,
+                    system_time=system_ns / 1e9
+                )
+            )
+    except subprocess.TimeoutExpired:
+        outcomes[index] = subprocess.TimeoutExpired(['java', '-cp', class_dir, 'Main'] + args, timeout)
+    except (OSError, ValueError, EOFError) as e:
+        print(f"Java batch harness failed, falling back to separate processes: {e}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+    return outcomes
+
+class _Reader:
+    """Reads the harness protocol from its stdout with per-case deadlines."""
+
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+        self.buffer = b''
+
+    def line(self, deadline: float) -> str:
+        while b'\n' not in self.buffer:
+            if not self._fill(deadline):
+                return ''
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return line.decode()
+
+    def exactly(self, length: int, deadline: float) -> bytes:
+        while len(self.buffer) < length:
+            if not self._fill(deadline):
+                raise EOFError("Harness exited mid-result")
+        data, self.buffer = self.buffer[:length], self.buffer[length:]
+        return data
+
+    def _fill(self, deadline: float) -> bool:
+        ready, _, _ = select.select([self.process.stdout], [], [], max(deadline - time.monotonic(), 0))
+        if not ready:
+            raise subprocess.TimeoutExpired(self.process.args, deadline)
+        chunk = os.read(self.process.stdout.fileno(), 65536)
+        if not chunk:
+            return False
+        self.buffer += chunk
+        return True
@@ -0,0 +1,60 @@
+import signal
+from enum import Enum
+from typing import Optional
+
+from .process import ProcessResult
+
+class Verdict(str, Enum):
+    PASSED = "OK"
+    WRONG_ANSWER = "WA"
+    TIME_LIMIT_EXCEEDED = "TLE"
+    MEMORY_LIMIT_EXCEEDED = "MLE"
+    RUNTIME_ERROR = "RE"
+    COMPILATION_ERROR = "CE"
+
+# Messages runtimes print when an allocation fails
+OUT_OF_MEMORY_MARKERS = (
+    "Out_of_memory",  # OCaml
+    "java.lang.OutOfMemoryError",  # Java
+    "Cannot allocate memory",
+    "std::bad_alloc",
+)
+
+def judge(
+    process: ProcessResult,
+    output_matches: bool,
+    cpu_limit: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None
+) -> Verdict:
+    """
+    Classify a finished run. Limits are only checked for performance test
+    cases; otherwise the verdict is decided by the output, with crashes that
+    produced wrong output reported as RUNTIME_ERROR. Runs that hit the wall
+    clock timeout (subprocess.TimeoutExpired) are TIME_LIMIT_EXCEEDED.
+    """
+    usage = process.usage
+    if cpu_limit is not None:
+        # SIGXCPU only comes from RLIMIT_CPU, whatever CPU time was measured
+        if process.returncode == -signal.SIGXCPU:
+            return Verdict.TIME_LIMIT_EXCEEDED
+        cpu_time = usage.user_time + usage.system_time if usage else 0.0
+        if cpu_time > cpu_limit or (process.returncode == -signal.SIGKILL and cpu_time >= cpu_limit):
+            return Verdict.TIME_LIMIT_EXCEEDED
+
+    # Only a run that failed can have exceeded the memory limit: the limit is
+    # enforced by the runtime or RLIMIT_DATA, which make allocations fail
+    if memory_limit_mb is not None and process.returncode != 0:
+        if any(marker in process.stderr for marker in OUT_OF_MEMORY_MARKERS):
+            return Verdict.MEMORY_LIMIT_EXCEEDED
+        # A refused allocation under RLIMIT_DATA leaves no trace: C programs
+        # crash or exit on a NULL from malloc, and static data too large for
+        # the limit kills the program at exec. Java runs under -Xmx instead
+        # and always reports OutOfMemoryError.
+        if process.memory_limit_mb is not None:
+            return Verdict.MEMORY_LIMIT_EXCEEDED
+
+    if output_matches:
+        return Verdict.PASSED
+    if process.returncode != 0 or process.truncated:
+        return Verdict.RUNTIME_ERROR
+    return Verdict.WRONG_ANSWER
@@ -0,0 +1,263 @@
+import os
+import queue
+import select
+import shlex
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+from .artifact_cache import ArtifactCache, artifact_cache
+from .process import EXECUTION_MAX_OUTPUT_BYTES, ProcessResult, Usage
+
+# Number of pre-started JVM workers; 0 disables the pool and every Java test
+# case runs in a fresh `java` process
+JAVA_WORKER_POOL_SIZE = int(os.getenv("JAVA_WORKER_POOL_SIZE", 0))
+# Retire a worker after this many runs
+JAVA_WORKER_MAX_RUNS = int(os.getenv("JAVA_WORKER_MAX_RUNS", 200))
+JAVA_WORKER_OPTS = shlex.split(os.getenv("JAVA_WORKER_OPTS", "-Djava.security.manager=allow -XX:+UseSerialGC"))
+
+WORKER_SOURCE = os.path.join(os.path.dirname(__file__), 'java', 'JvmWorker.java')
+STARTUP_TIMEOUT = 30
+
+class WorkerError(Exception):
+    """The worker died or broke protocol; the run should be retried on a cold JVM."""
+
+class JvmWorker:
+    """A single long-lived JVM running JvmWorker.java."""
+
+    def __init__(self, classpath: str):
+        self.runs = 0
+        self.clean = True
+        self.process = subprocess.Popen(
+            ['java'] + JAVA_WORKER_OPTS + ['-cp', classpath, 'JvmWorker'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self._buffer = b''
+        header = self._read_line(time.monotonic() + STARTUP_TIMEOUT).split()
+        if not header or header[0] != 'READY':
+            self.close()
+            raise WorkerError(f"Unexpected worker handshake: {header}")
+        self.guarded = header[1:] == ['1']
+
+    def run(self, class_dir: str, args: List[str], timeout: float, max_output_bytes: int) -> ProcessResult:
+        started = time.monotonic()
+        deadline = started + timeout
+        command = ['java', '-cp', class_dir, 'Main'] + args
+        try:
+            request = '\t'.join([class_dir, str(max_output_bytes)] + args) + '\n'
+            self.process.stdin.write(request.encode())
+            self.process.stdin.flush()
+        except OSError as e:
+            raise WorkerError(f"Worker is not accepting requests: {e}")
+
+        header = self._read_line(deadline, command, timeout).split()
+        if len(header) != 8 or header[0] != 'DONE':
+            raise WorkerError(f"Unexpected worker response: {header}")
+        status, out_length, err_length, clean, truncated, user_ns, system_ns = (int(field) for field in header[1:])
+        stdout = self._read_exactly(out_length, deadline, command, timeout)
+        stderr = self._read_exactly(err_length, deadline, command, timeout)
+
+        self.runs += 1
+        self.clean = bool(clean)
+        return ProcessResult(
+            command,
+            status,
+            stdout=stdout.decode(errors='replace'),
+            stderr=stderr.decode(errors='replace'),
+            truncated=bool(truncated),
+            # The worker's memory is shared across runs, so there is no per-run peak RSS
+            usage=Usage(
+                wall_time=time.monotonic() - started,
+                user_time=user_ns / 1e9,
+                system_time=system_ns / 1e9
+            )
+        )
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def _fill(self, deadline: float, command=None, timeout=None):
+        remaining = deadline - time.monotonic()
+        ready, _, _ = select.select([self.process.stdout], [], [], max(remaining, 0))
+        if not ready:
+            self.process.kill()
+            self.process.wait()
+            raise subprocess.TimeoutExpired(command or 'JvmWorker', timeout or STARTUP_TIMEOUT)
+        chunk = os.read(self.process.stdout.fileno(), 65536)
+        if not chunk:
+            raise WorkerError("Worker exited")
+        self._buffer += chunk
+
+    def _read_line(self, deadline: float, command=None, timeout=None) -> str:
+        while b'\n' not in self._buffer:
+            self._fill(deadline, command, timeout)
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.decode()
+
+    def _read_exactly(self, length: int, deadline: float, command, timeout) -> bytes:
+        while len(self._buffer) < length:
+            self._fill(deadline, command, timeout)
+        data, self._buffer = self._buffer[:length], self._buffer[length:]
+        return data
+
+class JvmWorkerPool:
+    """
+    Pool of warm JVM workers. `run` borrows a worker, executes one test case
+    and returns it to the pool, or retires it after `max_runs` runs, a timeout,
+    or any sign of misbehaviour (leftover threads, protocol errors).
+    """
+
+    def __init__(self, size: int = JAVA_WORKER_POOL_SIZE, max_runs: int = JAVA_WORKER_MAX_RUNS):
+        self.size = size
+        self.max_runs = max_runs
+        self._idle: "queue.LifoQueue[JvmWorker]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._started = 0
+        self._classpath: Optional[str] = None
+        self._classpath_lock = threading.Lock()
+        self.warm_runs = 0
+        self.fallbacks = 0
+        self.recycled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self):
+        """Pre-start all workers in the background."""
+        if self.enabled:
+            threading.Thread(target=self._prestart, name="jvm-pool-start", daemon=True).start()
+
+    def run(
+        self,
+        class_dir: str,
+        args: List[str],
+        timeout: float,
+        max_output_bytes: int = EXECUTION_MAX_OUTPUT_BYTES
+    ) -> Optional[ProcessResult]:
+        """
+        Run compiled `Main` from `class_dir` on a warm worker. Returns None when
+        the run must be repeated on a cold JVM (pool disabled, worker died).
+        Raises subprocess.TimeoutExpired like subprocess.run would.
+        """
+        if not self.enabled:
+            return None
+        try:
+            worker = self._borrow()
+        except (OSError, WorkerError, subprocess.TimeoutExpired) as e:
+            print(f"Could not start JVM worker: {e}")
+            self.fallbacks += 1
+            return None
+
+        try:
+            result = worker.run(class_dir, args, timeout, max_output_bytes)
+        except subprocess.TimeoutExpired:
+            self._retire(worker)
+            raise
+        except WorkerError as e:
+            print(f"JVM worker failed, falling back to a cold JVM: {e}")
+            self._retire(worker)
+            self.fallbacks += 1
+            return None
+
+        self.warm_runs += 1
+        if worker.clean and worker.runs < self.max_runs and worker.alive():
+            self._idle.put(worker)
+        else:
+            self._retire(worker)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "warm_runs": self.warm_runs,
+            "fallbacks": self.fallbacks,
+            "recycled": self.recycled,
+        }
+
+    def _prestart(self):
+        for _ in range(self.size):
+            try:
+                with self._lock:
+                    if self._started >= self.size:
+                        return
+                    self._started += 1
+                self._idle.put(self._spawn())
+            except (OSError, WorkerError, subprocess.TimeoutExpired) as e:
+                with self._lock:
+                    self._started -= 1
+                print(f"Could not pre-start JVM worker: {e}")
+                return
+
+    def _borrow(self) -> JvmWorker:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                can_spawn = self._started < self.size
+                if can_spawn:
+                    self._started += 1
+            if can_spawn:
+                try:
+                    return self._spawn()
+                except BaseException:
+                    with self._lock:
+                        self._started -= 1
+                    raise
+            # Every worker is busy; wait for one to be returned or retired
+            try:
+                return self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _retire(self, worker: JvmWorker):
+        worker.close()
+        self.recycled += 1
+        with self._lock:
+            self._started -= 1
+
+    def _spawn(self) -> JvmWorker:
+        return JvmWorker(self.worker_classpath())
+
+    def worker_classpath(self) -> str:
+        with self._classpath_lock:
+            if self._classpath is None:
+                self._classpath = self._build_worker()
+            return self._classpath
+
+    def _build_worker(self) -> str:
+        with open(WORKER_SOURCE) as f:
+            source = f.read()
+        command = ['javac', 'JvmWorker.java']
+
+        def build(directory: str):
+            with open(os.path.join(directory, 'JvmWorker.java'), 'w') as f:
+                f.write(source)
+            process = subprocess.run(command, cwd=directory, capture_output=True, text=True)
+            return process.returncode == 0, process.stderr.strip()
+
+        # Stays pinned in the artifact cache for the lifetime of the server
+        artifact = artifact_cache.acquire(ArtifactCache.key('java-worker', command, source), build)
+        if not artifact.ok:
+            artifact_cache.release(artifact)
+            raise WorkerError(f"Could not compile JVM worker: {artifact.stderr}")
+        return artifact.path
+
+jvm_pool = JvmWorkerPool()
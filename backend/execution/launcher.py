@@ -0,0 +1,47 @@
+import os
+import subprocess
+import threading
+from typing import Optional
+
+from .artifact_cache import ArtifactCache, artifact_cache
+
+LAUNCHER_SOURCE = os.path.join(os.path.dirname(__file__), 'c', 'launcher.c')
+LAUNCHER_COMPILE_TIMEOUT = 60
+
+_path: Optional[str] = None
+_built = False
+_lock = threading.Lock()
+
+def launcher_path() -> Optional[str]:
+    """
+    The compiled launcher.c that run_process starts programs through, or None
+    when it cannot be built (e.g. no gcc); run_process then starts programs
+    directly. Built once through the artifact cache and kept pinned.
+    """
+    global _path, _built
+    with _lock:
+        if not _built:
+            _built = True
+            try:
+                _path = _build()
+            except Exception as e:
+                print(f"Process launcher unavailable, memory usage will only be reported when reliable: {e}")
+        return _path
+
+def _build() -> str:
+    with open(LAUNCHER_SOURCE) as f:
+        source = f.read()
+    command = ['gcc', '-O2', 'launcher.c', '-o', 'launcher']
+
+    def build(directory: str):
+        with open(os.path.join(directory, 'launcher.c'), 'w') as f:
+            f.write(source)
+        process = subprocess.run(command, cwd=directory, capture_output=True, text=True, timeout=LAUNCHER_COMPILE_TIMEOUT)
+        return process.returncode == 0, process.stderr.strip()
+
+    # Stays pinned in the artifact cache for the lifetime of the server
+    artifact = artifact_cache.acquire(ArtifactCache.key('launcher', command, source), build)
+    if not artifact.ok:
+        artifact_cache.release(artifact)
+        raise RuntimeError(f"Could not compile launcher: {artifact.stderr}")
+    return os.path.join(artifact.path, 'launcher')
@@ -0,0 +1,290 @@
+import math
+import os
+import resource
+import select
+import selectors
+import signal
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .launcher import launcher_path
+
+# Combined stdout+stderr a program may produce before it is stopped
+EXECUTION_MAX_OUTPUT_BYTES = int(os.getenv("EXECUTION_MAX_OUTPUT_BYTES", 64 * 1024))
+
+READ_CHUNK = 32 * 1024
+WAIT_POLL_INTERVAL = 0.005
+
+@dataclass
+class Usage:
+    """Resources used by one child process. Times are in seconds."""
+    wall_time: float
+    user_time: float
+    system_time: float
+    max_rss_kb: Optional[int] = None  # the program's own peak; None when it could not be measured
+
+class ProcessResult(subprocess.CompletedProcess):
+    """
+    CompletedProcess that also records whether output was cut off at the byte
+    cap, the resources the process used and the RLIMIT_DATA it ran under.
+    """
+
+    def __init__(
+        self,
+        args,
+        returncode,
+        stdout,
+        stderr,
+        truncated: bool = False,
+        usage: Optional[Usage] = None,
+        memory_limit_mb: Optional[int] = None
+    ):
+        super().__init__(args, returncode, stdout=stdout, stderr=stderr)
+        self.truncated = truncated
+        self.usage = usage
+        self.memory_limit_mb = memory_limit_mb
+
+def run_process(
+    args: List[str],
+    timeout: float,
+    max_output_bytes: int = EXECUTION_MAX_OUTPUT_BYTES,
+    executable: Optional[str] = None,
+    cwd: Optional[str] = None,
+    cpu_limit: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+    env: Optional[Dict[str, str]] = None
+) -> ProcessResult:
+    """
+    Run a program, reading its stdout/stderr incrementally. Once more than
+    `max_output_bytes` have been produced the program is killed and the
+    result is marked truncated, so a runaway print loop cannot buffer
+    unbounded output. The program's CPU time and peak memory are reported
+    (see _Program). Raises subprocess.TimeoutExpired like subprocess.run,
+    with the usage attached as `usage`.
+
+    `cpu_limit` (seconds) and `memory_limit_mb` are enforced with
+    RLIMIT_CPU and RLIMIT_DATA, set in the child before it execs the program,
+    so they also cover static data and allocations made at startup.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    program = _Program(args, executable, cwd, env, cpu_limit, memory_limit_mb)
+    process = program.process
+    stdout_fd, stderr_fd = process.stdout.fileno(), process.stderr.fileno()
+    chunks = {stdout_fd: [], stderr_fd: []}
+    total = 0
+    truncated = False
+
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(process.stdout, selectors.EVENT_READ)
+            selector.register(process.stderr, selectors.EVENT_READ)
+            while selector.get_map() and not truncated:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(args, timeout)
+                for key, _ in selector.select(remaining):
+                    data = os.read(key.fd, READ_CHUNK)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        continue
+                    chunks[key.fd].append(data[:max_output_bytes - total])
+                    total += len(data)
+                    if total > max_output_bytes:
+                        truncated = True
+                        program.kill()
+                        break
+
+        returncode, usage = program.wait(deadline, started)
+    except subprocess.TimeoutExpired:
+        program.kill()
+        _, usage = program.wait(None, started)
+        error = subprocess.TimeoutExpired(args, timeout)
+        error.usage = usage
+        raise error
+    finally:
+        process.stdout.close()
+        process.stderr.close()
+        program.close()
+
+    return ProcessResult(
+        args,
+        returncode,
+        stdout=b''.join(chunks[stdout_fd]).decode(errors='replace'),
+        stderr=b''.join(chunks[stderr_fd]).decode(errors='replace'),
+        truncated=truncated,
+        usage=usage,
+        memory_limit_mb=memory_limit_mb
+    )
+
+class _Program:
+    """
+    One program started by run_process. It is started through the launcher
+    (execution/c/launcher.c) when that could be built: the launcher sets the
+    rlimits in a forked child before exec and reports the child's own wait4
+    usage. Linux carries the parent's peak resident memory over to a child
+    across exec, so a program started straight from the server would report
+    the server's high-water mark. Without the launcher the rlimits are set in
+    a preexec_fn (which runs Python in the forked child of a threaded server,
+    so it is only the fallback) and peak memory may be unknown.
+    """
+
+    def __init__(
+        self,
+        args: List[str],
+        executable: Optional[str],
+        cwd: Optional[str],
+        env: Optional[Dict[str, str]],
+        cpu_limit: Optional[float],
+        memory_limit_mb: Optional[int]
+    ):
+        self._report = None
+        launcher = launcher_path()
+        if launcher is None:
+            self.process = subprocess.Popen(
+                args,
+                executable=executable,
+                cwd=cwd,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                preexec_fn=_limit_setter(cpu_limit, memory_limit_mb)
+            )
+            self.pid = self.process.pid
+            # Read after the child was started, so at least what it inherited
+            self.inherited_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return
+
+        cpu_seconds, data_bytes = _limits(cpu_limit, memory_limit_mb)
+        report_read, report_write = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                [
+                    launcher, str(report_write),
+                    '-' if cpu_seconds is None else str(cpu_seconds),
+                    '-' if data_bytes is None else str(data_bytes),
+                    executable or args[0]
+                ] + list(args),
+                cwd=cwd,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                pass_fds=(report_write,)
+            )
+        except BaseException:
+            os.close(report_read)
+            raise
+        finally:
+            os.close(report_write)
+        self._report = report_read
+        # "PID <pid>\n" arrives as soon as the launcher has forked
+        self._received = b''
+        while b'\n' not in self._received:
+            data = os.read(report_read, READ_CHUNK)
+            if not data:
+                break
+            self._received += data
+        header = self._received.split(b'\n', 1)[0].split()
+        self.pid = int(header[1]) if header[:1] == [b'PID'] else self.process.pid
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def wait(self, deadline: Optional[float], started: float) -> Tuple[int, Usage]:
+        """
+        Reap the program, raising TimeoutExpired if it outlives `deadline`.
+        Returns its exit status (minus the signal that killed it) and usage.
+        """
+        report = b''
+        if self._report is not None:
+            # The launcher writes its report and exits right after the program
+            # does; once the report is complete, wait4 returns without polling
+            report = self._read_report(deadline)
+            returncode, rusage = _wait(self.process)
+        else:
+            returncode, rusage = _wait(self.process, deadline)
+        usage = Usage(
+            wall_time=time.monotonic() - started,
+            user_time=rusage.ru_utime,
+            system_time=rusage.ru_stime
+        )
+        if self._report is None:
+            usage.max_rss_kb = _peak_rss_kb(rusage, self.inherited_kb)
+            return returncode, usage
+
+        fields = report.split(b'\n', 1)[1].split() if b'\n' in report else []
+        if fields[:1] == [b'ERROR']:
+            error = int(fields[1])
+            raise OSError(error, os.strerror(error), self.process.args[4])
+        if fields[:1] == [b'DONE']:
+            returncode = int(fields[1])
+            usage.user_time = int(fields[2]) / 1e6
+            usage.system_time = int(fields[3]) / 1e6
+            usage.max_rss_kb = int(fields[4])
+        return returncode, usage
+
+    def _read_report(self, deadline: Optional[float]) -> bytes:
+        """The launcher's report, raising TimeoutExpired if it is not complete by `deadline`."""
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([self._report], [], [], remaining)[0]:
+                    raise subprocess.TimeoutExpired(self.process.args, 0)
+            data = os.read(self._report, READ_CHUNK)
+            if not data:
+                return self._received
+            self._received += data
+
+    def close(self):
+        if self._report is not None:
+            os.close(self._report)
+            self._report = None
+
+def _limits(cpu_limit: Optional[float], memory_limit_mb: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+    """RLIMIT_CPU soft limit in whole seconds and RLIMIT_DATA in bytes."""
+    cpu_seconds = max(1, math.ceil(cpu_limit)) if cpu_limit is not None else None
+    data_bytes = memory_limit_mb * 1024 * 1024 if memory_limit_mb is not None else None
+    return cpu_seconds, data_bytes
+
+def _limit_setter(cpu_limit: Optional[float], memory_limit_mb: Optional[int]) -> Optional[Callable[[], None]]:
+    """preexec_fn that applies the limits, for when the launcher is unavailable."""
+    cpu_seconds, data_bytes = _limits(cpu_limit, memory_limit_mb)
+    if cpu_seconds is None and data_bytes is None:
+        return None
+
+    def set_limits():
+        if cpu_seconds is not None:
+            # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        if data_bytes is not None:
+            resource.setrlimit(resource.RLIMIT_DATA, (data_bytes, data_bytes))
+    return set_limits
+
+def _wait(process: subprocess.Popen, deadline: Optional[float] = None) -> Tuple[int, resource.struct_rusage]:
+    """Reap `process` with wait4, raising TimeoutExpired if it outlives `deadline`."""
+    while True:
+        pid, status, rusage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+        if pid:
+            # Tell Popen the child is gone so it never waits on the pid again
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return process.returncode, rusage
+        if time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, 0)
+        time.sleep(WAIT_POLL_INTERVAL)
+
+def _peak_rss_kb(rusage: resource.struct_rusage, inherited_kb: int) -> Optional[int]:
+    """
+    The child's peak resident memory, or None when it cannot be told apart
+    from the server's: without the launcher, wait4's ru_maxrss is only the
+    child's own peak when it is above what the server had already reached.
+    """
+    if rusage.ru_maxrss > inherited_kb:
+        return rusage.ru_maxrss  # kilobytes on Linux
+    return None
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .process import EXECUTION_MAX_OUTPUT_BYTES, ProcessResult
+from .runner import OCAML_EXECUTION_MODE, ProgrammingLanguage
+
+# Bump whenever a change to the runner can change what a program prints, so
+# results recorded by an older version are never served
+RUNNER_VERSION = "1"
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 10000))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 3600))  # seconds
+
+# Calls whose result depends on more than the source and the arguments.
+# Submissions using any of them are never cached.
+NONDETERMINISTIC_PATTERNS = {
+    ProgrammingLanguage.OCAML: re.compile(
+        r"\bRandom\.|\bSys\.time\b|\bUnix\.|\bHashtbl\.randomize\b|\bThread\.|\bDomain\."
+    ),
+    ProgrammingLanguage.JAVA: re.compile(
+        r"\bRandom\b|\bMath\.random\b|\bSystem\.(currentTimeMillis|nanoTime|identityHashCode)\b|"
+        r"\bUUID\.randomUUID\b|\b(Instant|LocalDate|LocalDateTime|LocalTime)\.now\b|\bThread\b|"
+        r"\bExecutor|\bparallelStream\b|\.parallel\(\)"
+    ),
+    ProgrammingLanguage.C: re.compile(
+        r"\b(s?rand|random|time|clock|gettimeofday|clock_gettime|getpid|pthread_create)\s*\(|/dev/u?random"
+    ),
+}
+
+def deterministic(language: ProgrammingLanguage, code: str) -> bool:
+    """Best-effort check that a submission's output depends only on its arguments."""
+    pattern = NONDETERMINISTIC_PATTERNS.get(ProgrammingLanguage(language))
+    return pattern is not None and not pattern.search(code)
+
+class ResultCache:
+    """
+    In-memory cache of finished runs keyed by (language, source hash, program
+    input, runner version). Values are the raw ProcessResult, so the caller
+    judges a cached run against the test case's expected output exactly as it
+    would a fresh one. Entries expire after `ttl` seconds and the least
+    recently used ones are evicted beyond `max_entries`. Only store runs that
+    exited on their own: timeouts raise instead of returning a ProcessResult,
+    and nondeterministic submissions should not be stored at all.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl: float = RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, ProcessResult]]" = OrderedDict()  # key -> (expiry, result)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    @staticmethod
+    def key(language: ProgrammingLanguage, code: str, input_args: str) -> str:
+        payload = json.dumps([
+            RUNNER_VERSION,
+            OCAML_EXECUTION_MODE,
+            EXECUTION_MAX_OUTPUT_BYTES,
+            ProgrammingLanguage(language).value,
+            hashlib.sha256(code.encode()).hexdigest(),
+            input_args,
+        ])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[ProcessResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, result: ProcessResult):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+result_cache = ResultCache()
@@ -0,0 +1,316 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+from .artifact_cache import Artifact, ArtifactCache, artifact_cache
+from .java_batch import BatchOutcome, batch_enabled, run_batch
+from .jvm_pool import jvm_pool
+from .process import ProcessResult, Usage, run_process
+from .workspace import workspaces
+
+class ProgrammingLanguage(str, Enum):
+    OCAML = "ocaml"
+    JAVA = "java"
+    C = "c"
+
+# Default per-test-case timeout in seconds
+RUN_TIMEOUT = 10
+COMPILE_TIMEOUT = 60
+COMPILE_MAX_OUTPUT_BYTES = 1024 * 1024
+
+# Number of threads used to run the test cases of a submission concurrently
+EXECUTION_WORKERS = int(os.getenv("EXECUTION_WORKERS", os.cpu_count() or 1))
+# Global cap on child processes (compilers and student programs) alive at once
+EXECUTION_MAX_PROCESSES = int(os.getenv("EXECUTION_MAX_PROCESSES", EXECUTION_WORKERS))
+
+_executor = ThreadPoolExecutor(max_workers=EXECUTION_WORKERS, thread_name_prefix="code-runner")
+_process_slots = threading.BoundedSemaphore(EXECUTION_MAX_PROCESSES)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+@contextmanager
+def process_slot():
+    """Hold one of the global child-process slots for the duration of the block."""
+    _process_slots.acquire()
+    try:
+        yield
+    finally:
+        _process_slots.release()
+
+def map_concurrently(fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """Apply `fn` to every item on the shared executor, returning results in input order."""
+    return list(_executor.map(fn, items))
+
+def submit_concurrently(fn: Callable[[T], R], items: Iterable[T]) -> List[Future]:
+    """Schedule `fn` for every item on the shared executor, returning one future per item."""
+    return [_executor.submit(fn, item) for item in items]
+
+class CompilationError(Exception):
+    """Raised when a submission fails to compile. Carries the compiler's stderr."""
+
+    def __init__(self, stderr: str):
+        super().__init__(stderr)
+        self.stderr = stderr
+
+SOURCE_FILES = {
+    ProgrammingLanguage.OCAML: 'main.ml',
+    ProgrammingLanguage.JAVA: 'Main.java',
+    ProgrammingLanguage.C: 'main.c',
+}
+
+# Compile commands, run inside the build directory
+COMPILE_COMMANDS = {
+    ProgrammingLanguage.JAVA: ['javac', 'Main.java'],
+    ProgrammingLanguage.C: ['gcc', 'main.c', '-o', 'program'],
+}
+
+# How OCaml submissions are run: "native" (ocamlopt), "bytecode" (ocamlc) or
+# "toplevel" (the `ocaml` interpreter for every test case)
+OCAML_EXECUTION_MODE = os.getenv("OCAML_EXECUTION_MODE", "native")
+OCAML_COMPILERS = {
+    "native": ['ocamlopt', 'ocamlc'],
+    "bytecode": ['ocamlc'],
+    "toplevel": [],
+}
+
+def ocaml_compile_command() -> Optional[List[str]]:
+    """The compile command for the configured OCaml mode, or None to use the toplevel."""
+    for compiler in OCAML_COMPILERS.get(OCAML_EXECUTION_MODE, []):
+        if shutil.which(compiler):
+            return [compiler, 'main.ml', '-o', 'program']
+    return None
+
+class CodeRunner:
+    """
+    Builds a submission once and runs the resulting program against any
+    number of inputs. Compiled languages are built through the artifact
+    cache, so identical submissions skip the compiler entirely. Use as a
+    context manager so resources are released when all test cases have run:
+
+        with CodeRunner(language, code) as runner:
+            for test_case in test_cases:
+                process = runner.run(test_case.input)
+    """
+
+    def __init__(self, language: ProgrammingLanguage, code: str, timeout: int = RUN_TIMEOUT):
+        self.language = ProgrammingLanguage(language)
+        self.code = code
+        self.timeout = timeout
+        self.dir_path: Optional[str] = None
+        self.artifact: Optional[Artifact] = None
+        self.command: List[str] = []
+        # Program to execute when command[0] is only the argv[0] the program sees
+        self.executable: Optional[str] = None
+        self.compile_usage: Optional[Usage] = None
+        # Seconds spent in the write, compile and cleanup stages (for benchmarks)
+        self.stage_times: Dict[str, float] = {}
+
+    def __enter__(self) -> "CodeRunner":
+        self.prepare()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+
+    def prepare(self):
+        """Write the source file and compile it. Raises CompilationError (Java/C)."""
+        try:
+            if self.language == ProgrammingLanguage.OCAML:
+                if self._prepare_compiled_ocaml():
+                    return
+                started = time.perf_counter()
+                self.dir_path = workspaces.acquire()
+                filename = os.path.join(self.dir_path, SOURCE_FILES[self.language])
+                with open(filename, 'w') as f:
+                    f.write(self.code)
+                self.stage_times['write'] = time.perf_counter() - started
+                self.command = ['ocaml', filename]
+                return
+
+            self.artifact = self._build(COMPILE_COMMANDS[self.language])
+            if not self.artifact.ok:
+                raise CompilationError(self.artifact.stderr)
+            if self.language == ProgrammingLanguage.JAVA:
+                self.command = ['java', '-cp', self.artifact.path, 'Main']
+            elif self.language == ProgrammingLanguage.C:
+                self.command = [os.path.join(self.artifact.path, 'program')]
+        except BaseException:
+            self.cleanup()
+            raise
+
+    def _prepare_compiled_ocaml(self) -> bool:
+        """
+        Build an OCaml submission once with ocamlopt/ocamlc. Returns False when
+        no compiler is available or the build fails or times out (e.g. the
+        code relies on toplevel directives), in which case the toplevel is
+        used as before.
+        """
+        command = ocaml_compile_command()
+        if command is None:
+            return False
+        try:
+            artifact = self._build(command)
+        except CompilationError:
+            return False
+        if not artifact.ok:
+            artifact_cache.release(artifact)
+            return False
+        self.artifact = artifact
+        # Keep Sys.argv.(0) as it is under `ocaml main.ml ...`
+        self.command = [SOURCE_FILES[self.language]]
+        self.executable = os.path.join(artifact.path, 'program')
+        return True
+
+    def program_args(self, input_args: str) -> List[str]:
+        """
+        Extract the program arguments from a stored test-case input. OCaml
+        inputs include `ocaml main.ml`, C inputs include `./main`, and Java
+        inputs are the bare arguments.
+        """
+        args = input_args.split()
+        if self.language == ProgrammingLanguage.OCAML:
+            return args[2:]
+        if self.language == ProgrammingLanguage.C:
+            return args[1:]
+        return args
+
+    def run(
+        self,
+        input_args: str,
+        cpu_limit: Optional[float] = None,
+        memory_limit_mb: Optional[int] = None
+    ) -> ProcessResult:
+        """
+        Run the built program for a single test case, optionally under a
+        CPU-time limit (seconds) and a memory limit for performance test cases.
+        """
+        args = self.program_args(input_args)
+        limited = cpu_limit is not None or memory_limit_mb is not None
+        command = self.command
+        jvm_options: List[str] = []
+        if self.language == ProgrammingLanguage.JAVA and memory_limit_mb is not None:
+            # The JVM reserves far more address space than it uses, so bound the heap instead
+            jvm_options = [f'-Xmx{memory_limit_mb}m']
+            command = ['java'] + jvm_options + command[1:]
+            memory_limit_mb = None
+        # Leave headroom over the CPU limit so it, not the wall clock, decides
+        timeout = max(self.timeout, 2 * cpu_limit + 1) if cpu_limit is not None else self.timeout
+
+        with process_slot():
+            if self.language == ProgrammingLanguage.JAVA and jvm_pool.enabled and not limited:
+                process = jvm_pool.run(self.artifact.path, args, self.timeout)
+                if process is not None:
+                    return process
+            if self.language == ProgrammingLanguage.JAVA and cpu_limit is not None:
+                return self._run_java_limited(command + args, args, timeout, jvm_options)
+            return run_process(
+                command + args,
+                timeout,
+                executable=self.executable,
+                cpu_limit=cpu_limit,
+                memory_limit_mb=memory_limit_mb
+            )
+
+    def _run_java_limited(self, command: List[str], args: List[str], timeout: float, jvm_options: List[str]) -> ProcessResult:
+        """
+        Run a Java performance test case. RLIMIT_CPU on `java` would also
+        count JVM startup, JIT compilation and GC threads, so the program runs
+        alone in a fresh batch harness, which reports the CPU time of the
+        thread running main; the wall-clock timeout stops runaway programs.
+        Programs the harness cannot run are run cold, with the CPU time of a
+        JVM that does nothing left out.
+        """
+        outcome = run_batch(self.artifact.path, [args], timeout, jvm_options=jvm_options)[0]
+        if isinstance(outcome, subprocess.TimeoutExpired):
+            raise outcome
+        if outcome is not None:
+            return outcome
+        process = run_process(command, timeout, executable=self.executable)
+        baseline = jvm_startup_cpu()
+        process.usage.user_time = max(process.usage.user_time - baseline, 0.0)
+        return process
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.language == ProgrammingLanguage.JAVA and batch_enabled()
+
+    def run_batch(self, inputs: List[str]) -> List[BatchOutcome]:
+        """
+        Run several test cases in one JVM (see java_batch.run_batch). Cases
+        the harness could not run come back as None.
+        """
+        with process_slot():
+            return run_batch(self.artifact.path, [self.program_args(i) for i in inputs], self.timeout)
+
+    def cleanup(self):
+        started = time.perf_counter()
+        if self.artifact:
+            artifact_cache.release(self.artifact)
+            self.artifact = None
+        if self.dir_path:
+            workspaces.release(self.dir_path)
+            self.dir_path = None
+        self.stage_times['cleanup'] = time.perf_counter() - started
+
+    def _build(self, command: List[str]) -> Artifact:
+        source_file = SOURCE_FILES[self.language]
+
+        def build(directory: str):
+            # Compile in a tmpfs workspace, with the compiler's temporary files there
+            # too, and only copy the finished outputs into the on-disk cache entry
+            workspace = workspaces.acquire()
+            try:
+                started = time.perf_counter()
+                with open(os.path.join(workspace, source_file), 'w') as f:
+                    f.write(self.code)
+                self.stage_times['write'] = time.perf_counter() - started
+                with process_slot():
+                    try:
+                        process = run_process(
+                            command, COMPILE_TIMEOUT, max_output_bytes=COMPILE_MAX_OUTPUT_BYTES,
+                            cwd=workspace, env={**os.environ, 'TMPDIR': workspace}
+                        )
+                    except subprocess.TimeoutExpired as e:
+                        self.compile_usage = e.usage
+                        self.stage_times['compile'] = e.usage.wall_time
+                        # Raised rather than returned so the artifact cache does not keep it:
+                        # a compile that was only slow under load must not fail that source forever
+                        raise CompilationError(f"Compilation timed out after {COMPILE_TIMEOUT} seconds")
+                shutil.copytree(workspace, directory, dirs_exist_ok=True)
+            finally:
+                workspaces.release(workspace)
+            # Only set when the compiler actually ran, not on artifact cache hits
+            self.compile_usage = process.usage
+            self.stage_times['compile'] = process.usage.wall_time
+            return process.returncode == 0, process.stderr.strip()
+
+        key = ArtifactCache.key(self.language.value, command, self.code)
+        return artifact_cache.acquire(key, build)
+
+_jvm_startup_cpu: Optional[float] = None
+_jvm_startup_lock = threading.Lock()
+
+def jvm_startup_cpu() -> float:
+    """CPU seconds a JVM spends starting and exiting, measured once with `java -version`."""
+    global _jvm_startup_cpu
+    with _jvm_startup_lock:
+        if _jvm_startup_cpu is None:
+            try:
+                usage = run_process(['java', '-version'], COMPILE_TIMEOUT).usage
+                _jvm_startup_cpu = usage.user_time + usage.system_time
+            except (OSError, subprocess.TimeoutExpired) as e:
+                print(f"Could not measure JVM startup CPU time: {e}")
+                _jvm_startup_cpu = 0.0
+        return _jvm_startup_cpu
+
+def execute_code(language: ProgrammingLanguage, code: str, input_args: str) -> ProcessResult:
+    """Build and run a submission against a single input."""
+    with CodeRunner(language, code) as runner:
+        return runner.run(input_args)
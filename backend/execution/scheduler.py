@@ -0,0 +1,167 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+# Submissions executing at once across all users
+SCHEDULER_MAX_RUNNING = int(os.getenv("SCHEDULER_MAX_RUNNING", os.cpu_count() or 1))
+# Submissions allowed to wait for a slot before new ones are rejected with 503
+SCHEDULER_MAX_QUEUED = int(os.getenv("SCHEDULER_MAX_QUEUED", 64))
+# Submissions a single user may have running or waiting before getting 429
+SCHEDULER_MAX_PER_USER = int(os.getenv("SCHEDULER_MAX_PER_USER", 2))
+# Longest a submission may wait for a slot before it is rejected with 503
+SCHEDULER_MAX_WAIT = float(os.getenv("SCHEDULER_MAX_WAIT", 30))
+
+class SchedulerRejected(Exception):
+    """Raised when a submission is not admitted. Maps onto an HTTP 429/503 response."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class ExecutionScheduler:
+    """
+    Admission control for code execution. At most `max_running` submissions
+    execute at once; others wait in a bounded queue that is served round-robin
+    across users, so one user's burst cannot starve everyone else. When the
+    queue is full, or a user already has `max_per_user` submissions in the
+    system, new submissions are rejected immediately with a Retry-After hint
+    instead of piling up and timing out together.
+    """
+
+    def __init__(
+        self,
+        max_running: int = SCHEDULER_MAX_RUNNING,
+        max_queued: int = SCHEDULER_MAX_QUEUED,
+        max_per_user: int = SCHEDULER_MAX_PER_USER,
+        max_wait: float = SCHEDULER_MAX_WAIT
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self.max_wait = max_wait
+        self._running = 0
+        self._queued = 0
+        self._per_user: Dict[str, int] = {}
+        # user -> waiters, in the order users are served
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self._recent_run_time = 1.0
+
+    @asynccontextmanager
+    async def slot(self, user_id: str):
+        """Hold an execution slot for `user_id` for the duration of the block."""
+        self.check_admission(user_id)
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        enqueued = time.monotonic()
+        try:
+            await self._acquire(user_id)
+        except BaseException:
+            self._leave(user_id)
+            raise
+
+        waited = time.monotonic() - enqueued
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_observed_wait = max(self.max_observed_wait, waited)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            # Exponentially weighted run time, used for Retry-After estimates
+            self._recent_run_time = 0.8 * self._recent_run_time + 0.2 * (time.monotonic() - started)
+            self._running -= 1
+            self._leave(user_id)
+            self._wake_next()
+
+    def check_admission(self, user_id: str):
+        """Raise SchedulerRejected if a submission from `user_id` would be turned away now."""
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            self.rejected += 1
+            raise SchedulerRejected(429, "Too many submissions in progress, please wait", self._retry_after())
+        if self._running >= self.max_running and self._queued >= self.max_queued:
+            self.rejected += 1
+            raise SchedulerRejected(503, "Code execution is busy, please try again shortly", self._retry_after())
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "queue_depth": self._queued,
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "average_wait_seconds": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait_seconds": self.max_observed_wait,
+        }
+
+    async def _acquire(self, user_id: str):
+        if self._running < self.max_running and not self._queued:
+            self._running += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if not self._cancel_waiter(user_id, waiter):
+                return
+            self.rejected += 1
+            raise SchedulerRejected(503, "Code execution is busy, please try again shortly", self._retry_after())
+        except asyncio.CancelledError:
+            # Client went away while waiting; give the slot on if we were just handed it
+            if not self._cancel_waiter(user_id, waiter):
+                self._running -= 1
+                self._wake_next()
+            raise
+
+    def _cancel_waiter(self, user_id: str, waiter: asyncio.Future) -> bool:
+        """Remove a waiter that gave up. Returns False if it had already been granted a slot."""
+        if waiter.done():
+            return False
+        waiter.cancel()
+        waiters = self._waiting.get(user_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued -= 1
+            if not waiters:
+                del self._waiting[user_id]
+        return True
+
+    def _wake_next(self):
+        while self._running < self.max_running and self._waiting:
+            # Round-robin: serve the user at the front, then move them to the back
+            user_id, waiters = next(iter(self._waiting.items()))
+            waiter = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            if waiter.done():
+                continue
+            self._running += 1
+            waiter.set_result(None)
+
+    def _leave(self, user_id: str):
+        remaining = self._per_user.get(user_id, 0) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _retry_after(self) -> int:
+        # Roughly how long until the current queue drains
+        backlog = (self._queued + self._running) / max(self.max_running, 1)
+        return max(1, int(backlog * self._recent_run_time + 0.5))
+
+scheduler = ExecutionScheduler()
@@ -0,0 +1,128 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import uuid
+from typing import List
+
+def _default_workspace_root() -> str:
+    # Prefer tmpfs so scratch files never touch the app volume
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "ai-practice-workspaces")
+
+WORKSPACE_ROOT = os.getenv("EXECUTION_WORKSPACE_ROOT", _default_workspace_root())
+# Number of empty workspaces kept ready for reuse
+WORKSPACE_POOL_SIZE = int(os.getenv("EXECUTION_WORKSPACE_POOL_SIZE", 16))
+
+WORKSPACE_PREFIX = "ws-"
+
+class WorkspaceManager:
+    """
+    Hands out scratch directories for submissions. Directories live under
+    `root` (tmpfs by default) and are named ws-<pid>-<uuid> so a restarted
+    server can tell which ones were orphaned by a dead process. Released
+    workspaces are emptied by a background janitor thread and returned to
+    the pool, keeping rmtree off the request path.
+    """
+
+    def __init__(self, root: str = WORKSPACE_ROOT, pool_size: int = WORKSPACE_POOL_SIZE):
+        self.root = root
+        self.pool_size = pool_size
+        self._pool: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._pooled = 0
+        self._dirty: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Sweep orphaned workspaces, pre-create the pool and start the janitor."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        os.makedirs(self.root, exist_ok=True)
+        self.sweep_orphans()
+        for _ in range(self.pool_size):
+            self._put(self._create())
+        threading.Thread(target=self._janitor, name="workspace-janitor", daemon=True).start()
+
+    def acquire(self) -> str:
+        self.start()
+        try:
+            path = self._pool.get_nowait()
+            with self._lock:
+                self._pooled -= 1
+            return path
+        except queue.Empty:
+            return self._create()
+
+    def release(self, path: str):
+        self._dirty.put(path)
+
+    def sweep_orphans(self) -> List[str]:
+        """Remove workspaces left behind by server processes that no longer exist."""
+        removed = []
+        for name in os.listdir(self.root):
+            if not name.startswith(WORKSPACE_PREFIX):
+                continue
+            try:
+                pid = int(name.split("-")[1])
+            except (IndexError, ValueError):
+                continue
+            if pid == os.getpid() or not _process_exists(pid):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                removed.append(name)
+        if removed:
+            print(f"Removed {len(removed)} orphaned workspaces from {self.root}")
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "root": self.root,
+            "pooled": self._pooled,
+            "pending_cleanup": self._dirty.qsize(),
+        }
+
+    def _create(self) -> str:
+        path = os.path.join(self.root, f"{WORKSPACE_PREFIX}{os.getpid()}-{uuid.uuid4()}")
+        os.makedirs(path)
+        return path
+
+    def _put(self, path: str) -> bool:
+        with self._lock:
+            if self._pooled >= self.pool_size:
+                return False
+            self._pooled += 1
+        self._pool.put(path)
+        return True
+
+    def _janitor(self):
+        while True:
+            path = self._dirty.get()
+            try:
+                _empty_directory(path)
+                if not self._put(path):
+                    os.rmdir(path)
+            except OSError as e:
+                print(f"Error cleaning up directory {path}: {e}")
+                shutil.rmtree(path, ignore_errors=True)
+
+def _empty_directory(path: str):
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+workspaces = WorkspaceManager()
@@ -0,0 +1,222 @@
+import difflib
+import hashlib
+import math
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from models import TestCaseResult
+
+# Most tokens spent on the code, question and test results of a feedback prompt
+FEEDBACK_PROMPT_TOKEN_BUDGET = int(os.getenv("FEEDBACK_PROMPT_TOKEN_BUDGET", 4000))
+# tiktoken encoding of the feedback model (gpt-4o-mini) and the file it is built from
+TOKENIZER_ENCODING = "o200k_base"
+TOKENIZER_FILE_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+
+# Detail levels tried in order until the prompt fits the budget:
+# (failed tests shown with a diff, diff lines per failure)
+DETAIL_LEVELS = [(5, 20), (3, 10), (1, 6), (0, 0)]
+# Share of the budget the test results may keep when the code and question must be truncated
+TEST_RESULTS_SHARE = 0.4
+MAX_LINE_CHARS = 200
+MAX_INPUT_CHARS = 200
+
+_encoder = None
+
+def tokenizer_cache_path() -> Optional[str]:
+    """Where tiktoken looks for the encoding file, resolved as tiktoken does; None when its cache is disabled."""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, hashlib.sha1(TOKENIZER_FILE_URL.encode()).hexdigest())
+
+def load_encoder():
+    """
+    Load tiktoken's encoding, once at startup. Only a file already in the
+    tiktoken cache is used: tiktoken would otherwise download it, so without
+    the file tokens are estimated from characters instead. Fill the cache at
+    build time with TIKTOKEN_CACHE_DIR set:
+    python -c "import tiktoken; tiktoken.get_encoding('o200k_base')"
+    """
+    global _encoder
+    path = tokenizer_cache_path()
+    if path is None or not os.path.isfile(path):
+        print(
+            f"Warning: no cached tiktoken encoding at {path}, prompt token counts are estimated "
+            f"from characters. Fill the cache as described in the README."
+        )
+        return
+    try:
+        import tiktoken
+        _encoder = tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"Warning: tiktoken unavailable, estimating tokens from characters: {str(e)}")
+
+def _get_encoder():
+    """The encoding loaded by load_encoder, or None when it was not loaded."""
+    return _encoder
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is None:
+        # Roughly four characters per token for English text and code
+        return math.ceil(len(text) / 4)
+    return len(encoder.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut the middle out of `text` so it fits in `max_tokens`, keeping its start and end."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _get_encoder()
+    marker = "\n... [truncated] ...\n"
+    keep = max(max_tokens - count_tokens(marker), 0)
+    head, tail = keep - keep // 3, keep // 3
+    if encoder is None:
+        return text[:head * 4] + marker + (text[-tail * 4:] if tail else "")
+    tokens = encoder.encode(text, disallowed_special=())
+    return encoder.decode(tokens[:head]) + marker + (encoder.decode(tokens[-tail:]) if tail else "")
+
+def test_passed(result: TestCaseResult) -> bool:
+    if result.verdict is not None:
+        return result.verdict == "OK"
+    return result.actualOutput == result.expectedOutput
+
+def _clip(line: str, limit: int = MAX_LINE_CHARS) -> str:
+    return line if len(line) <= limit else line[:limit] + f"... [{len(line) - limit} more characters]"
+
+def _ranges(numbers: List[int]) -> str:
+    """1, 2, 3, 5 -> "1-3, 5"."""
+    parts, start = [], None
+    for index, number in enumerate(numbers):
+        if start is None:
+            start = number
+        if index + 1 == len(numbers) or numbers[index + 1] != number + 1:
+            parts.append(str(start) if start == number else f"{start}-{number}")
+            start = None
+    return ", ".join(parts)
+
+def output_diff(expected: str, actual: str, max_lines: int) -> str:
+    """
+    A diff of expected vs actual output from their first differing line, at
+    most `max_lines` long with clipped lines. Only that window is diffed, so
+    the cost does not grow with the length of the outputs.
+    """
+    expected_lines, actual_lines = expected.splitlines(), actual.splitlines()
+    first = next(
+        (i for i, (e, a) in enumerate(zip(expected_lines, actual_lines)) if e != a),
+        min(len(expected_lines), len(actual_lines))
+    )
+    header = f"First difference at line {first + 1} (expected {len(expected_lines)} lines, got {len(actual_lines)})"
+    if max_lines <= 0:
+        return header
+    start = max(first - 1, 0)
+    diff = [
+        line for line in difflib.unified_diff(
+            expected_lines[start:start + max_lines], actual_lines[start:start + max_lines], n=1, lineterm=""
+        )
+        if not line.startswith(("---", "+++", "@@"))
+    ]
+    shown = [_clip(line) for line in diff[:max_lines]]
+    if len(diff) > max_lines or start + max_lines < max(len(expected_lines), len(actual_lines)):
+        shown.append("...")
+    return "\n".join([header] + shown)
+
+def summarize_test_results(results: List[TestCaseResult], detailed_failures: int, diff_lines: int) -> str:
+    """Pass/fail summary of every test, with a bounded diff for the first few failures only."""
+    passed = [i + 1 for i, result in enumerate(results) if test_passed(result)]
+    failed = [i + 1 for i, result in enumerate(results) if not test_passed(result)]
+    lines = [f"Passed {len(passed)} of {len(results)} tests."]
+    if passed:
+        lines.append(f"Passed: {_ranges(passed)}")
+    if failed:
+        lines.append(f"Failed: {_ranges(failed)}")
+    for number in failed[:detailed_failures]:
+        result = results[number - 1]
+        verdict = f" ({result.verdict})" if result.verdict else ""
+        lines.append(f"\nTest {number} failed{verdict}. Input: {_clip(result.input, MAX_INPUT_CHARS)}")
+        lines.append(output_diff(result.expectedOutput, result.actualOutput, diff_lines))
+    if len(failed) > detailed_failures:
+        lines.append(f"\n({len(failed) - detailed_failures} more failed tests not shown)")
+    return "\n".join(lines)
+
+class CompactionStats:
+    """Token counts of feedback prompts before and after compaction, for /api/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.truncated = 0
+
+    def record(self, before: int, after: int, truncated: bool):
+        with self._lock:
+            self.prompts += 1
+            self.tokens_before += before
+            self.tokens_after += after
+            self.truncated += int(truncated)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "prompts": self.prompts,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "truncated": self.truncated,
+                "budget": FEEDBACK_PROMPT_TOKEN_BUDGET,
+                "tokenizer": "tiktoken" if _encoder is not None else "estimate",
+            }
+
+compaction_stats = CompactionStats()
+
+def compact_feedback_inputs(
+    code: str,
+    question: str,
+    results: List[TestCaseResult],
+    budget: int = FEEDBACK_PROMPT_TOKEN_BUDGET
+) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    The code, question and test results for a feedback prompt, within
+    `budget` tokens. Test results become a pass/fail summary with diffs for
+    failures; if that is still too long, fewer and shorter diffs are shown,
+    then the question and finally the code are cut in the middle. Returns the
+    inputs and their token counts before and after compaction.
+    """
+    # What the prompt used to contain: every actual output, verbatim
+    raw_tokens = count_tokens(code) + count_tokens(question) + count_tokens(str([r.actualOutput for r in results]))
+    code_tokens, question_tokens = count_tokens(code), count_tokens(question)
+
+    summaries = []
+    for detailed_failures, diff_lines in DETAIL_LEVELS:
+        summary = summarize_test_results(results, detailed_failures, diff_lines)
+        summaries.append((summary, count_tokens(summary)))
+        if code_tokens + question_tokens + summaries[-1][1] <= budget:
+            break
+    else:
+        # Nothing fits whole: keep the most detailed summary within its share
+        # and make room for it by truncating the question and code below
+        share = int(budget * TEST_RESULTS_SHARE)
+        summaries = [next(((s, t) for s, t in summaries if t <= share), summaries[-1])]
+    summary, summary_tokens = summaries[-1]
+
+    truncated = code_tokens + question_tokens + summary_tokens > budget
+    if truncated:
+        remaining = max(budget - summary_tokens, 0)
+        # The code matters most, so the question gives way first
+        question = truncate_tokens(question, min(question_tokens, remaining // 4))
+        question_tokens = count_tokens(question)
+        code = truncate_tokens(code, max(remaining - question_tokens, 0))
+        code_tokens = count_tokens(code)
+
+    compacted_tokens = code_tokens + question_tokens + summary_tokens
+    compaction_stats.record(raw_tokens, compacted_tokens, truncated)
+    return (
+        {"code": code, "question": question, "test_results": summary},
+        {"tokens_before": raw_tokens, "tokens_after": compacted_tokens}
+    )
@@ -0,0 +1,148 @@
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from models import Feedback, Question, QuestionWithoutTestCases, TestCases
+from prompts import FEEDBACK_PROMPT_TEMPLATES, JAVA_TEST_CASE_GENERATION_PROMPT_TEMPLATE, QUESTION_GENERATION_PROMPT_TEMPLATES
+
+load_dotenv()
+
+LLM_MODEL = "gpt-4o-mini"
+# Seconds to wait for one LLM call (including output parsing) before giving up
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+# Keep-alive connections to the LLM endpoint shared by all chains
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+
+# Latencies kept per chain for the percentiles in /api/metrics
+LATENCY_SAMPLES = 200
+
+# Set by start(): the async client belongs to the event loop it is first used on,
+# so it must be created inside the server's loop rather than at import
+http_client: Optional[httpx.Client] = None
+http_async_client: Optional[httpx.AsyncClient] = None
+
+class Chain:
+    """
+    A prompt | llm | parser chain built once at startup. The parser's format
+    instructions are computed once and filled in on every call, and call
+    latencies are recorded for /api/metrics.
+    """
+
+    def __init__(self, name: str, template: str, output_model: type, llm: BaseChatModel):
+        self.name = name
+        self.prompt = ChatPromptTemplate.from_messages([("user", template)])
+        self.parser = PydanticOutputParser(pydantic_object=output_model)
+        self.format_instructions = self.parser.get_format_instructions()
+        self.text_runnable = self.prompt | llm
+        self.runnable = self.text_runnable | self.parser
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.calls = 0
+        self.errors = 0
+
+    def inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {**inputs, "format_instructions": self.format_instructions}
+
+    async def ainvoke(self, inputs: Dict[str, Any]) -> BaseModel:
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await self.runnable.ainvoke(self.inputs(inputs))
+            ok = True
+            return result
+        finally:
+            self.record(time.perf_counter() - started, ok)
+
+    async def astream_text(self, inputs: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the raw model output; parse it with `self.parser` when done."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            async for chunk in self.text_runnable.astream(self.inputs(inputs)):
+                yield chunk.content
+            ok = True
+        finally:
+            self.record(time.perf_counter() - started, ok)
+
+    def record(self, seconds: float, ok: bool):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self._latencies.append(seconds)
+            else:
+                self.errors += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "latency_mean": statistics.mean(latencies) if latencies else None,
+        }
+
+def _build_chains(llm: BaseChatModel) -> Dict[str, Chain]:
+    chains = {}
+    for language, template in QUESTION_GENERATION_PROMPT_TEMPLATES.items():
+        # Java questions get their test cases from a separate chain
+        output_model = QuestionWithoutTestCases if language == "java" else Question
+        chains[f"question:{language}"] = Chain(f"question:{language}", template, output_model, llm)
+    chains["test_cases:java"] = Chain("test_cases:java", JAVA_TEST_CASE_GENERATION_PROMPT_TEMPLATE, TestCases, llm)
+    for language, template in FEEDBACK_PROMPT_TEMPLATES.items():
+        chains[f"feedback:{language}"] = Chain(f"feedback:{language}", template, Feedback, llm)
+    return chains
+
+# Filled by start()
+chains: Dict[str, Chain] = {}
+
+def start():
+    """Create the HTTP clients, the model and the chains. Call from the server's event loop."""
+    global http_client, http_async_client
+    if chains:
+        return
+    limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+    http_client = httpx.Client(limits=limits, timeout=LLM_TIMEOUT)
+    http_async_client = httpx.AsyncClient(limits=limits, timeout=LLM_TIMEOUT)
+    llm = ChatOpenAI(
+        model=LLM_MODEL,
+        temperature=0.7,
+        store=True,
+        cache=False,
+        timeout=LLM_TIMEOUT,
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
+    chains.update(_build_chains(llm))
+
+def question_chain(language: str) -> Chain:
+    return chains[f"question:{language}"]
+
+def test_cases_chain() -> Chain:
+    return chains["test_cases:java"]
+
+def feedback_chain(language: str) -> Chain:
+    return chains[f"feedback:{language}"]
+
+def stats() -> dict:
+    return {name: chain.stats() for name, chain in chains.items()}
+
+async def close():
+    global http_client, http_async_client
+    if http_async_client is not None:
+        await http_async_client.aclose()
+        http_client.close()
+    http_client = http_async_client = None
+    chains.clear()
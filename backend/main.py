@@ -1,12 +1,11 @@
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
-from langchain.output_parsers import PydanticOutputParser
 import uuid
+import asyncio
+import concurrent.futures
+import json
 from fastapi import FastAPI, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Callable, List, Dict, Optional, Set, Tuple, Union
 import random
 from google.oauth2 import id_token
 from google.auth.transport import requests
@@ -22,8 +21,13 @@ from models import (
     SubmitRequest, 
     TestCaseResult, 
     RunTestsResponse,
+    ResourceUsage,
+    TestCaseResultEvent,
+    RunTestsSummaryEvent,
     LanguageSettings,
-    TestCases
+    SubmitResponse,
+    FeedbackStatus,
+    FeedbackStatusResponse
 )
 
 import os
@@ -31,13 +35,30 @@ import subprocess
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from fastapi.responses import JSONResponse 
-from prompts import JAVA_TEST_CASE_GENERATION_PROMPT_TEMPLATE, QUESTION_GENERATION_PROMPT_TEMPLATES, FEEDBACK_PROMPT_TEMPLATES, APPLICATION_DOMAINS
+from fastapi.responses import JSONResponse, StreamingResponse
+from prompts import APPLICATION_DOMAINS, PERFORMANCE_TEST_CASE_INSTRUCTIONS
+import llm_chains
+from llm_chains import LLM_TIMEOUT
 
 from database.models import DBUser, DBQuestion, DBUserSolvedQuestion
-from database.config import get_db, init_db
+from database.config import SessionLocal, get_db, init_db
+from database.question_cache import question_cache, to_question
+from database.question_bank import find_reusable_question, should_reuse
+from database.feedback_cache import feedback_cache
+from question_pool import question_pool
+from question_index import INDEXED_TEXT_CHARS, PastQuestion, question_index
+from feedback_prompt import compact_feedback_inputs, compaction_stats, load_encoder
+from streaming import Broadcaster, sse_event, stream_structured
+from execution.runner import ProgrammingLanguage, CodeRunner, CompilationError, map_concurrently, submit_concurrently
+from execution.artifact_cache import artifact_cache
+from execution.process import EXECUTION_MAX_OUTPUT_BYTES, ProcessResult, Usage
+from execution.judge import Verdict, judge
+from execution.jvm_pool import jvm_pool
+from execution.workspace import workspaces
+from execution.scheduler import scheduler, SchedulerRejected
+from execution.result_cache import ResultCache, deterministic, result_cache
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
-from enum import Enum
 
 # Load environment variables from .env file
 load_dotenv()
@@ -225,95 +246,221 @@ async def get_token_from_header(authorization: Optional[str] = Header(None)) ->
 # Initialize database tables
 init_db()
 
-# Update question generation endpoint to store questions
-@app.post("/api/generate_question")
-async def generate_question(
-    params: QuestionParams,
-    token_payload: dict = Depends(get_token_from_header),
-    db: Session = Depends(get_db)
-):
+# Sweep orphaned scratch workspaces and start their janitor
+workspaces.start()
+
+# Pre-start warm JVM workers (no-op unless JAVA_WORKER_POOL_SIZE is set)
+jvm_pool.start()
+
+@app.on_event("startup")
+async def start_llm():
+    # Before the question pool, which starts generating questions right away
+    llm_chains.start()
+
+@app.on_event("startup")
+async def start_question_pool():
+    # Keep ready questions for every language's default settings (no-op if QUESTION_POOL_SIZE is 0)
+    question_pool.start(
+        create_question,
+        [
+            QuestionParams(programming_language=language, **settings)
+            for language, settings in LANGUAGE_DEFAULTS.items()
+        ]
+    )
+
+@app.on_event("startup")
+async def load_tokenizer():
+    # Reads the encoding from the tiktoken cache only, never downloading it
+    await asyncio.to_thread(load_encoder)
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    if feedback_sweeper is not None:
+        feedback_sweeper.cancel()
+    await question_pool.stop()
+    await llm_chains.close()
+
+# How often a pending LLM call checks whether the client has gone away
+DISCONNECT_POLL_INTERVAL = 0.5
+
+async def invoke_chain(chain, inputs: dict, http_request: Optional[Request] = None):
+    """
+    Await `chain.ainvoke(inputs)` on the event loop, so other requests keep
+    being served meanwhile. The call is cancelled after LLM_TIMEOUT seconds
+    (504) or as soon as the client disconnects (499). Background callers
+    pass no request.
+    """
+    deadline = asyncio.get_running_loop().time() + LLM_TIMEOUT
+    task = asyncio.create_task(chain.ainvoke(inputs))
     try:
-        print(f"Received params: {params}")
-        print(f"Token payload: {token_payload}")
+        return await wait_for_llm(task, deadline, http_request)
+    finally:
+        task.cancel()
 
-        # Get current user
-        user = db.query(DBUser).filter(DBUser.google_id == token_payload["sub"]).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+async def bounded_stream(events: AsyncIterator, http_request: Optional[Request] = None) -> AsyncIterator:
+    """
+    Iterate over a streamed LLM call under the same rules as invoke_chain:
+    the whole stream must finish within LLM_TIMEOUT seconds (504), and it is
+    abandoned as soon as the client disconnects (499).
+    """
+    deadline = asyncio.get_running_loop().time() + LLM_TIMEOUT
+    iterator = events.__aiter__()
+    try:
+        while True:
+            step = asyncio.ensure_future(iterator.__anext__())
+            try:
+                item = await wait_for_llm(step, deadline, http_request)
+            except StopAsyncIteration:
+                return
+            finally:
+                if not step.done():
+                    step.cancel()
+                    # Let the cancellation finish before closing the stream below
+                    await asyncio.wait({step})
+            yield item
+    finally:
+        await iterator.aclose()
+
+async def wait_for_llm(task: asyncio.Future, deadline: float, http_request: Optional[Request]):
+    """Result of `task`, polling for a disconnected client until `deadline` (loop time)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise HTTPException(status_code=504, detail=f"LLM call timed out after {LLM_TIMEOUT} seconds")
+        done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_INTERVAL, remaining))
+        if task in done:
+            return task.result()
+        if http_request is not None and await http_request.is_disconnected():
+            raise HTTPException(status_code=499, detail="Client closed request")
+
+def question_stage(params: QuestionParams, avoid_names: List[str]) -> Tuple[llm_chains.Chain, dict]:
+    """
+    Chain and inputs for the LLM call that writes the question. For OCaml and
+    C it also writes the test cases; Java gets them from a second call (see
+    complete_question).
+    """
+    if params.programming_language in ["ocaml", "c"]:
+        inputs = {
+            "difficulty": params.difficulty,
+            "topics": ", ".join(params.topics),
+            "avoid_questions": "\n".join([f"- {name}" for name in avoid_names]),
+            "performance_instructions": performance_instructions(params)
+        }
+    else:
+        # For Java, generate question and test cases separately, in a randomly selected domain
+        inputs = {
+            "domain": random.choice(APPLICATION_DOMAINS),
+            "difficulty": params.difficulty,
+            "topics": ", ".join(params.topics),
+            "avoid_questions": "\n".join([f"- {name}" for name in avoid_names])
+        }
+    return llm_chains.question_chain(params.programming_language), inputs
+
+def performance_instructions(params: QuestionParams) -> str:
+    return PERFORMANCE_TEST_CASE_INSTRUCTIONS if params.performance_tests else ""
+
+async def complete_question(
+    params: QuestionParams,
+    generated: Union[Question, QuestionWithoutTestCases],
+    http_request: Optional[Request] = None
+) -> Question:
+    """Turn the output of the question stage into a finished Question."""
+    if isinstance(generated, Question):
+        question = generated
+    else:
+        # Then generate test cases
+        test_cases = await invoke_chain(llm_chains.test_cases_chain(), {
+            "question": generated.text,
+            "performance_instructions": performance_instructions(params)
+        }, http_request)
 
-        # Fetch questions already solved by this user
-        solved_questions = (
-            db.query(DBQuestion)
+        # Combine into final Question object
+        question = Question(
+            name=generated.name,
+            text=generated.text,
+            hint=generated.hint,
+            programming_language=params.programming_language,
+            testCases=test_cases.testCases
+        )
+    
+    # Strip whitespace from expected outputs
+    for test_case in question.testCases:
+        test_case.expectedOutput = test_case.expectedOutput.strip()
+    return question
+
+async def create_question(
+    params: QuestionParams,
+    avoid_names: List[str],
+    http_request: Optional[Request] = None
+) -> Question:
+    """Generate a new question with the LLM. Nothing is stored."""
+    chain, inputs = question_stage(params, avoid_names)
+    generated = await invoke_chain(chain, inputs, http_request)
+    return await complete_question(params, generated, http_request)
+
+def previous_questions(db: Session, user: DBUser) -> List[PastQuestion]:
+    """
+    Every question this user has been given, with what the similarity index
+    needs to add it if it is not indexed yet (e.g. after a restart).
+    """
+    return [
+        PastQuestion(*row)
+        for row in (
+            db.query(
+                DBQuestion.id,
+                DBQuestion.name,
+                func.substr(DBQuestion.text, 1, INDEXED_TEXT_CHARS),
+                DBQuestion.programming_language,
+                DBQuestion.difficulty,
+                DBQuestion.topics
+            )
             .join(DBUserSolvedQuestion)
             .filter(DBUserSolvedQuestion.user_id == user.id)
             .all()
         )
-        
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7, store=True, cache=False)
-        
-        if params.programming_language in ["ocaml", "c"]:
-            # Use existing code for OCaml and C
-            output_parser = PydanticOutputParser(pydantic_object=Question)
-
-            prompt = ChatPromptTemplate.from_messages([
-                ("user", QUESTION_GENERATION_PROMPT_TEMPLATES[params.programming_language])
-            ])
-
-            chain = prompt | llm | output_parser
-            
-            # Generate new question
-            question = chain.invoke({
-                "difficulty": params.difficulty,
-                "topics": ", ".join(params.topics),
-                "avoid_questions": "\n".join([f"- {q.name}" for q in solved_questions]),
-                "format_instructions": output_parser.get_format_instructions()
-            })
-        else:
-            # For Java, generate question and test cases separately
-            question_parser = PydanticOutputParser(pydantic_object=QuestionWithoutTestCases)
-            test_cases_parser = PydanticOutputParser(pydantic_object=TestCases)
-
-            # Randomly select a domain
-            selected_domain = random.choice(APPLICATION_DOMAINS)
-
-            # Generate question first
-            question_prompt = ChatPromptTemplate.from_messages([
-                ("user", QUESTION_GENERATION_PROMPT_TEMPLATES["java"])
-            ])
-            question_chain = question_prompt | llm | question_parser
-            
-            question_without_tests = question_chain.invoke({
-                "domain": selected_domain,
-                "difficulty": params.difficulty,
-                "topics": ", ".join(params.topics),
-                "avoid_questions": "\n".join([f"- {q.name}" for q in solved_questions]),
-                "format_instructions": question_parser.get_format_instructions()
-            })
-
-            # Then generate test cases
-            test_cases_prompt = ChatPromptTemplate.from_messages([
-                ("user", JAVA_TEST_CASE_GENERATION_PROMPT_TEMPLATE)
-            ])
-            test_cases_chain = test_cases_prompt | llm | test_cases_parser
-
-            test_cases = test_cases_chain.invoke({
-                "question": question_without_tests.text,
-                "format_instructions": test_cases_parser.get_format_instructions()
-            })
-
-            # Combine into final Question object
-            question = Question(
-                name=question_without_tests.name,
-                text=question_without_tests.text,
-                hint=question_without_tests.hint,
-                programming_language=params.programming_language,
-                testCases=test_cases.testCases
-            )
-        
-        # Strip whitespace from expected outputs
-        for test_case in question.testCases:
-            test_case.expectedOutput = test_case.expectedOutput.strip()
-        
+    ]
+
+def prompt_avoid_names(previous: List[PastQuestion], params: QuestionParams) -> List[str]:
+    """The past questions most like this request, bounded so prompt size does not grow with the user's history."""
+    return question_index.most_similar(previous, params.programming_language, params.difficulty, params.topics)
+
+def ready_question(
+    db: Session,
+    user: DBUser,
+    params: QuestionParams,
+    avoid_names: List[str]
+) -> Tuple[Optional[Question], Optional[DBQuestion]]:
+    """
+    A question that can be served without calling the LLM, as (question,
+    stored row): a stored question this user has not been given yet, or a
+    pre-generated one from the pool (not stored yet). (None, None) on a miss.
+    """
+    # Reuse a stored question this user has not been given yet, when one fits
+    if not params.performance_tests and should_reuse():
+        db_question = find_reusable_question(
+            db,
+            user.id,
+            params.programming_language,
+            params.difficulty,
+            params.topics,
+            avoid_names
+        )
+        if db_question is not None:
+            return to_question(db_question), db_question
+
+    # Serve a pre-generated question when one fits
+    return question_pool.take(params, avoid_names), None
+
+def store_question(
+    db: Session,
+    user: DBUser,
+    params: QuestionParams,
+    question: Question,
+    db_question: Optional[DBQuestion] = None
+) -> Question:
+    """Record that the user was given `question`, storing the question itself if it is new."""
+    if db_question is None:
         # Store question in database
         db_question = DBQuestion(
             name=question.name,
@@ -327,183 +474,543 @@ async def generate_question(
         db.add(db_question)
         db.commit()
         db.refresh(db_question)
-        
-        # Create initial test results with empty actual outputs
-        initial_test_results = [
-            {
-                "input": tc.input,
-                "expectedOutput": tc.expectedOutput,
-                "actualOutput": ""  # Empty actual output initially
-            }
-            for tc in question.testCases
-        ]
+    
+    # Create initial test results with empty actual outputs
+    initial_test_results = [
+        {
+            "input": tc.input,
+            "expectedOutput": tc.expectedOutput,
+            "actualOutput": ""  # Empty actual output initially
+        }
+        for tc in question.testCases
+    ]
 
-        # Create the solved question record
-        solved_question = DBUserSolvedQuestion(
-            user_id=user.id,
-            question_id=db_question.id,
-            user_code="",  # No code submitted yet
-            test_results=initial_test_results,  # Initialize with all test cases
-            is_correct=False,  # Not solved yet
-            feedback={  # Initial feedback
-                "isCorrect": False,
-                "feedback": "Question not attempted yet",
-                "strengths": [],
-                "weaknesses": ["Not attempted"],
-                "topics": params.topics  # Include topics in feedback
-            }
-        )
-        
-        db.add(solved_question)
-        db.commit()
-        
-        # Update question with database ID and programming language before returning
-        question.id = db_question.id
-        question.programming_language = params.programming_language
-        return question
+    # Create the solved question record
+    solved_question = DBUserSolvedQuestion(
+        user_id=user.id,
+        question_id=db_question.id,
+        user_code="",  # No code submitted yet
+        test_results=initial_test_results,  # Initialize with all test cases
+        is_correct=False,  # Not solved yet
+        feedback={  # Initial feedback
+            "isCorrect": False,
+            "feedback": "Question not attempted yet",
+            "strengths": [],
+            "weaknesses": ["Not attempted"],
+            "topics": params.topics  # Include topics in feedback
+        }
+    )
+    
+    db.add(solved_question)
+    db.commit()
+    
+    question_index.add(
+        db_question.id,
+        question.name,
+        question.text,
+        params.programming_language,
+        params.difficulty,
+        params.topics
+    )
+    
+    # Update question with database ID and programming language before returning
+    question.id = db_question.id
+    question.programming_language = params.programming_language
+    question_cache.put(question.copy(deep=True))
+    return question
+
+# Update question generation endpoint to store questions
+@app.post("/api/generate_question")
+async def generate_question(
+    params: QuestionParams,
+    http_request: Request,
+    token_payload: dict = Depends(get_token_from_header),
+    db: Session = Depends(get_db)
+):
+    try:
+        print(f"Received params: {params}")
+        print(f"Token payload: {token_payload}")
+
+        # Get current user
+        user = db.query(DBUser).filter(DBUser.google_id == token_payload["sub"]).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        previous = previous_questions(db, user)
+
+        # Served questions must not repeat any earlier one; the prompt only lists the closest
+        question, db_question = ready_question(db, user, params, [question.name for question in previous])
+        if question is None:
+            # Otherwise ask the LLM
+            question = await create_question(params, prompt_avoid_names(previous, params), http_request)
+
+        return store_question(db, user, params, question, db_question)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error generating question: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-class ProgrammingLanguage(str, Enum):
-    OCAML = "ocaml"
-    JAVA = "java"
-    C = "c"
+@app.post("/api/generate_question/stream")
+async def generate_question_stream(
+    params: QuestionParams,
+    http_request: Request,
+    token_payload: dict = Depends(get_token_from_header),
+    db: Session = Depends(get_db)
+):
+    """
+    Like /api/generate_question, but streams Server-Sent Events: "partial"
+    events carry the question's name and text as the LLM writes them, then a
+    "question" event carries the validated Question with its database id, or
+    an "error" event carries the failure.
+    """
+    user = db.query(DBUser).filter(DBUser.google_id == token_payload["sub"]).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-def execute_code(language: ProgrammingLanguage, code: str, input_args: str) -> subprocess.CompletedProcess:
-    unique_id = str(uuid.uuid4())
-    dir_path = f'temp_{unique_id}'
-    os.makedirs(dir_path)
+    return StreamingResponse(
+        stream_question(user.id, params, http_request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_question(user_id: int, params: QuestionParams, http_request: Request):
+    # The request's session is closed before the body is streamed, so use our own
+    db = SessionLocal()
     try:
-        if language == ProgrammingLanguage.OCAML:
-            filename = os.path.join(dir_path, 'main.ml')
-            with open(filename, 'w') as f:
-                f.write(code)
-            return subprocess.run(
-                ['ocaml', filename] + input_args.split()[2:],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-        elif language == ProgrammingLanguage.JAVA:
-            filename = os.path.join(dir_path, 'Main.java')
-            with open(filename, 'w') as f:
-                f.write(code)
-            # Compile Java code
-            subprocess.run(['javac', filename], check=True, capture_output=True)
-            # Run Java code
-            return subprocess.run(
-                ['java', '-cp', dir_path, 'Main'] + input_args.split(),
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-        elif language == ProgrammingLanguage.C:
-            filename = os.path.join(dir_path, 'main.c')
-            executable = os.path.join(dir_path, 'program')
-            with open(filename, 'w') as f:
-                f.write(code)
-            # Compile C code
-            subprocess.run(['gcc', filename, '-o', executable], check=True, capture_output=True)
-            # Run compiled program
-            return subprocess.run(
-                [executable] + input_args.split()[1:],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+        user = db.query(DBUser).filter(DBUser.id == user_id).first()
+        previous = previous_questions(db, user)
+
+        question, db_question = ready_question(db, user, params, [question.name for question in previous])
+        if question is None:
+            chain, inputs = question_stage(params, prompt_avoid_names(previous, params))
+            events = stream_structured(chain, inputs, ["name", "text"])
+            async for kind, value in bounded_stream(events, http_request):
+                if kind == "partial":
+                    yield sse_event("partial", value)
+                else:
+                    generated = value
+            question = await complete_question(params, generated, http_request)
+
+        question = store_question(db, user, params, question, db_question)
+        yield sse_event("question", {"id": question.id, "question": question.dict()})
+    except Exception as e:
+        print(f"Error generating question: {str(e)}")
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        yield sse_event("error", {"detail": detail})
     finally:
-        # Cleanup directory and all files
-        cleanup_files(dir_path)
+        db.close()
 
-def cleanup_files(dir_path: str):
-    try:
-        # Remove directory and all its contents
-        import shutil
-        shutil.rmtree(dir_path)
-    except OSError as e:
-        print(f"Error cleaning up directory {dir_path}: {e}")
+# Limits for performance test cases that do not set their own
+DEFAULT_PERFORMANCE_TIME_LIMIT = 2.0  # CPU seconds
+DEFAULT_PERFORMANCE_MEMORY_LIMIT_MB = 256
 
 @app.post("/api/run_tests", response_model=RunTestsResponse)
 async def run_tests(
     request: RunTestsRequest,
-    token_payload: dict = Depends(get_token_from_header)
+    token_payload: dict = Depends(get_token_from_header),
+    db: Session = Depends(get_db)
 ):
-    results = []
-    for test_case in request.question.testCases:
-        try:
-            process = execute_code(
-                ProgrammingLanguage(request.programming_language),
-                request.code,
-                test_case.input
+    question = resolve_question(db, request.question_id, request.question)
+    return await run_scheduled(
+        token_payload["sub"],
+        request.programming_language,
+        request.code,
+        question.testCases
+    )
+
+def resolve_question(db: Session, question_id: Optional[int], question: Optional[Question]) -> Question:
+    """
+    The question a run or submit request refers to. Stored questions are
+    always loaded on the server, so clients cannot change their test cases.
+    """
+    if question_id is None and question is not None:
+        question_id = question.id
+    if question_id is None:
+        if question is None:
+            raise HTTPException(status_code=422, detail="question_id is required")
+        return question
+    stored = question_cache.get(db, question_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return stored
+
+async def run_scheduled(user_id: str, language: str, code: str, test_cases: List[TestCase]) -> RunTestsResponse:
+    """
+    Run a submission's test cases under the execution scheduler. Runs found
+    in the result cache need no slot, so a fully cached re-run is answered
+    even when the scheduler is full.
+    """
+    results = cached_results(language, code, test_cases)
+    if all(result is not None for result in results):
+        return RunTestsResponse(results=results)
+    try:
+        async with scheduler.slot(user_id):
+            # Compiling and running block on child processes, so keep them off the event loop
+            return await asyncio.to_thread(execute_test_cases, language, code, test_cases, results)
+    except SchedulerRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def execute_test_cases(
+    language: str,
+    code: str,
+    test_cases: List[TestCase],
+    results: Optional[List[Optional[TestCaseResult]]] = None
+) -> RunTestsResponse:
+    """Run the test cases that have no result yet; `results` defaults to the cached ones."""
+    if results is None:
+        results = cached_results(language, code, test_cases)
+    missing = [index for index, result in enumerate(results) if result is None]
+    if not missing:
+        # Every run was cached, so there is nothing to compile
+        return RunTestsResponse(results=results)
+
+    runner = None
+    try:
+        runner = CodeRunner(ProgrammingLanguage(language), code)
+        # Build the submission once and run the test cases against it
+        with runner:
+            for index, result in zip(missing, run_all_test_cases(runner, [test_cases[i] for i in missing])):
+                results[index] = result
+    except CompilationError as e:
+        results = error_results(test_cases, f"Compilation Error: {e.stderr}", Verdict.COMPILATION_ERROR)
+    except Exception as e:
+        results = error_results(test_cases, f"Error: {str(e)}", Verdict.RUNTIME_ERROR)
+    return RunTestsResponse(
+        results=results,
+        compileUsage=resource_usage(runner.compile_usage) if runner else None
+    )
+
+def cached_results(language: str, code: str, test_cases: List[TestCase]) -> List[Optional[TestCaseResult]]:
+    """Results for the test cases whose run is in the result cache, None for the others."""
+    results: List[Optional[TestCaseResult]] = [None] * len(test_cases)
+    try:
+        language = ProgrammingLanguage(language)
+    except ValueError:
+        return results
+    if not result_cache.enabled or not deterministic(language, code):
+        return results
+    for index, test_case in enumerate(test_cases):
+        # Performance cases are judged on timings, which vary from run to run
+        if test_case.performance:
+            continue
+        process = result_cache.get(ResultCache.key(language, code, test_case.input))
+        if process is not None:
+            results[index] = evaluate_test_case(test_case, process)
+            results[index].cached = True
+    return results
+
+def remember_outcome(runner: CodeRunner, test_case: TestCase, outcome: Union[ProcessResult, Exception, None]):
+    """Store a run that finished on its own in the result cache."""
+    if (
+        result_cache.enabled
+        and isinstance(outcome, ProcessResult)
+        and not test_case.performance
+        and deterministic(runner.language, runner.code)
+    ):
+        result_cache.put(ResultCache.key(runner.language, runner.code, test_case.input), outcome)
+
+def resource_usage(usage: Optional[Usage]) -> Optional[ResourceUsage]:
+    if usage is None:
+        return None
+    return ResourceUsage(
+        wallTime=usage.wall_time,
+        userTime=usage.user_time,
+        systemTime=usage.system_time,
+        maxRssKb=usage.max_rss_kb
+    )
+
+def error_results(test_cases: List[TestCase], message: str, verdict: Verdict) -> List[TestCaseResult]:
+    return [
+        TestCaseResult(
+            input=test_case.input,
+            expectedOutput=test_case.expectedOutput,
+            actualOutput=message,
+            verdict=verdict
+        )
+        for test_case in test_cases
+    ]
+
+@app.post("/api/run_tests/stream")
+async def run_tests_stream(
+    request: RunTestsRequest,
+    token_payload: dict = Depends(get_token_from_header),
+    db: Session = Depends(get_db)
+):
+    """
+    Like /api/run_tests, but streams newline-delimited JSON: one
+    TestCaseResultEvent per test case as soon as it finishes (in completion
+    order, tagged with its index), then a RunTestsSummaryEvent.
+    """
+    question = resolve_question(db, request.question_id, request.question)
+    try:
+        # Reject up front so the client gets a proper 429/503 instead of a stream
+        scheduler.check_admission(token_payload["sub"])
+    except SchedulerRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return StreamingResponse(
+        stream_test_results(request, question.testCases, token_payload["sub"]),
+        media_type="application/x-ndjson"
+    )
+
+async def stream_test_results(request: RunTestsRequest, test_cases: List[TestCase], user_id: str):
+    results = cached_results(request.programming_language, request.code, test_cases)
+    missing = [index for index, result in enumerate(results) if result is None]
+    runner = None
+
+    for index, result in enumerate(results):
+        if result is not None:
+            yield TestCaseResultEvent(index=index, result=result).json() + "\n"
+
+    try:
+        if missing:
+            async with scheduler.slot(user_id):
+                # Everything still using the build, which is released once all of it
+                # has finished, also when the client disconnects halfway
+                in_use: List[asyncio.Future] = []
+                try:
+                    failed = None
+                    try:
+                        runner = CodeRunner(ProgrammingLanguage(request.programming_language), request.code)
+                        in_use.append(asyncio.ensure_future(asyncio.to_thread(runner.prepare)))
+                        # Shielded: a cancelled request cannot stop the build in its thread
+                        await asyncio.shield(in_use[0])
+                    except CompilationError as e:
+                        failed = error_results(test_cases, f"Compilation Error: {e.stderr}", Verdict.COMPILATION_ERROR)
+                    except Exception as e:
+                        failed = error_results(test_cases, f"Error: {str(e)}", Verdict.RUNTIME_ERROR)
+
+                    if failed is not None:
+                        for index in missing:
+                            results[index] = failed[index]
+                            yield TestCaseResultEvent(index=index, result=results[index]).json() + "\n"
+                    else:
+                        stream = stream_from_runner(runner, [test_cases[i] for i in missing], in_use)
+                        try:
+                            async for position, result in stream:
+                                results[missing[position]] = result
+                                yield TestCaseResultEvent(index=missing[position], result=result).json() + "\n"
+                        finally:
+                            await stream.aclose()
+                finally:
+                    if runner is not None:
+                        release_runner(runner, in_use)
+    except SchedulerRejected as e:
+        yield json.dumps({"type": "error", "detail": e.detail, "retry_after": e.retry_after}) + "\n"
+        return
+
+    yield RunTestsSummaryEvent(
+        passed=sum(result.actualOutput == result.expectedOutput for result in results),
+        total=len(results),
+        results=results,
+        compileUsage=resource_usage(runner.compile_usage) if runner else None
+    ).json() + "\n"
+
+async def stream_from_runner(runner: CodeRunner, test_cases: List[TestCase], in_use: List[asyncio.Future]):
+    """Yield (index, TestCaseResult) pairs as test cases complete. Their runs are added to `in_use`."""
+    futures = submit_concurrently(lambda test_case: run_test_case(runner, test_case), test_cases)
+    in_use.extend(asyncio.wrap_future(future) for future in futures)
+
+    async def indexed(index: int, future):
+        return index, await asyncio.wrap_future(future)
+
+    try:
+        for next_result in asyncio.as_completed([indexed(i, f) for i, f in enumerate(futures)]):
+            yield await next_result
+    finally:
+        # If the client disconnected, drop the queued cases
+        for future in futures:
+            future.cancel()
+
+def release_runner(runner: CodeRunner, in_use: List[asyncio.Future]):
+    """Clean up the runner once everything in `in_use` has finished, without waiting for it."""
+    loop = asyncio.get_running_loop()
+    asyncio.gather(*in_use, return_exceptions=True).add_done_callback(
+        lambda _: loop.run_in_executor(None, runner.cleanup)
+    )
+
+def run_all_test_cases(runner: CodeRunner, test_cases: List[TestCase]) -> List[TestCaseResult]:
+    """
+    Run every test case against a prepared runner, in test-case order. Java
+    regular test cases go through the single-JVM batch harness when it is
+    enabled; everything it could not run is executed concurrently in
+    separate processes.
+    """
+    results: List[Optional[TestCaseResult]] = [None] * len(test_cases)
+
+    if runner.supports_batch:
+        # Performance cases need their own rlimits, so they always run separately
+        batch = [i for i, test_case in enumerate(test_cases) if not test_case.performance]
+        outcomes = runner.run_batch([test_cases[i].input for i in batch])
+        for index, outcome in zip(batch, outcomes):
+            if outcome is not None:
+                remember_outcome(runner, test_cases[index], outcome)
+                results[index] = evaluate_test_case(test_cases[index], outcome)
+
+    remaining = [i for i, result in enumerate(results) if result is None]
+    for index, result in zip(
+        remaining,
+        map_concurrently(lambda i: run_test_case(runner, test_cases[i]), remaining)
+    ):
+        results[index] = result
+    return results
+
+def performance_limits(test_case: TestCase) -> Tuple[Optional[float], Optional[int]]:
+    """CPU-time (seconds) and memory (MB) limits for a test case; None for regular cases."""
+    if not test_case.performance:
+        return None, None
+    return (
+        test_case.timeLimitSeconds or DEFAULT_PERFORMANCE_TIME_LIMIT,
+        test_case.memoryLimitMb or DEFAULT_PERFORMANCE_MEMORY_LIMIT_MB
+    )
+
+def run_test_case(runner: CodeRunner, test_case: TestCase) -> TestCaseResult:
+    cpu_limit, memory_limit_mb = performance_limits(test_case)
+    try:
+        process = runner.run(test_case.input, cpu_limit=cpu_limit, memory_limit_mb=memory_limit_mb)
+    except Exception as e:
+        return evaluate_test_case(test_case, e)
+    remember_outcome(runner, test_case, process)
+    return evaluate_test_case(test_case, process)
+
+def evaluate_test_case(test_case: TestCase, outcome: Union[ProcessResult, Exception]) -> TestCaseResult:
+    """Turn a finished run, or the exception it raised, into a TestCaseResult."""
+    cpu_limit, memory_limit_mb = performance_limits(test_case)
+    try:
+        if isinstance(outcome, Exception):
+            raise outcome
+        process = outcome
+
+        actual_output = process.stdout.strip()
+        error_output = process.stderr.strip()
+
+        if error_output:
+            actual_output = f"{actual_output}\nError: {error_output}"
+
+        if process.truncated:
+            actual_output = (
+                f"{actual_output}\nError: Output exceeded {EXECUTION_MAX_OUTPUT_BYTES} bytes, program was stopped"
             )
-            
-            actual_output = process.stdout.strip()
-            error_output = process.stderr.strip()
-            
-            if error_output:
-                actual_output = f"{actual_output}\nError: {error_output}"
-
-            results.append(TestCaseResult(
-                input=test_case.input,
-                expectedOutput=test_case.expectedOutput,
-                actualOutput=str(actual_output)
-            ))
-            
-        except subprocess.TimeoutExpired:
-            results.append(TestCaseResult(
-                input=test_case.input,
-                expectedOutput=test_case.expectedOutput,
-                actualOutput="Error: Execution timed out"
-            ))
-        except Exception as e:
-            results.append(TestCaseResult(
-                input=test_case.input,
-                expectedOutput=test_case.expectedOutput,
-                actualOutput=f"Error: {str(e)}"
-            ))
-                
-    return RunTestsResponse(results=results)
-
-def generate_feedback(request: SubmitRequest, is_correct: bool):
-    # Initialize ChatGPT for feedback generation
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7, store=True, cache=False)
-    output_parser = PydanticOutputParser(pydantic_object=Feedback)
-
-    # Create prompt template for code feedback
-    prompt = ChatPromptTemplate.from_messages([
-        ("user", FEEDBACK_PROMPT_TEMPLATES[request.programming_language])
-    ])
-
-    # Create chain and generate feedback
-    chain = prompt | llm | output_parser
-
-    feedback = chain.invoke({
-        "code": request.code,
-        "question": request.question.text,
-        "test_results": [result.actualOutput for result in request.test_results],
-        "is_correct": is_correct,
-        "format_instructions": output_parser.get_format_instructions()
-    })
-    return feedback
-
-@app.post("/api/submit", response_model=Feedback)
+
+        verdict = judge(
+            process,
+            str(actual_output) == test_case.expectedOutput,
+            cpu_limit=cpu_limit,
+            memory_limit_mb=memory_limit_mb
+        )
+        if verdict == Verdict.TIME_LIMIT_EXCEEDED:
+            actual_output = f"{actual_output}\nError: Time limit of {cpu_limit} seconds exceeded"
+        elif verdict == Verdict.MEMORY_LIMIT_EXCEEDED:
+            actual_output = f"{actual_output}\nError: Memory limit of {memory_limit_mb} MB exceeded"
+
+        return TestCaseResult(
+            input=test_case.input,
+            expectedOutput=test_case.expectedOutput,
+            actualOutput=str(actual_output),
+            truncated=process.truncated,
+            usage=resource_usage(process.usage),
+            verdict=verdict
+        )
+
+    except subprocess.TimeoutExpired as e:
+        return TestCaseResult(
+            input=test_case.input,
+            expectedOutput=test_case.expectedOutput,
+            actualOutput="Error: Execution timed out",
+            usage=resource_usage(getattr(e, "usage", None)),
+            verdict=Verdict.TIME_LIMIT_EXCEEDED
+        )
+    except Exception as e:
+        return TestCaseResult(
+            input=test_case.input,
+            expectedOutput=test_case.expectedOutput,
+            actualOutput=f"Error: {str(e)}",
+            verdict=Verdict.RUNTIME_ERROR
+        )
+
+async def generate_feedback(
+    programming_language: str,
+    code: str,
+    question: Question,
+    test_results: List[TestCaseResult],
+    is_correct: bool,
+    on_partial: Optional[Callable[[dict], None]] = None
+):
+    """
+    Ask the LLM for feedback on a submission. With `on_partial`, the output
+    is streamed and `on_partial` is called with the feedback text so far.
+    """
+    chain = llm_chains.feedback_chain(programming_language)
+    # Pass/fail summary with bounded diffs for failures, within the prompt token budget
+    # Tokenizing and diffing long outputs is CPU-bound, so keep it off the event loop
+    inputs, tokens = await asyncio.to_thread(compact_feedback_inputs, code, question.text, test_results)
+    print(
+        f"Feedback prompt for question {question.id} ({programming_language}): "
+        f"{tokens['tokens_before']} tokens, {tokens['tokens_after']} after compaction"
+    )
+    inputs["is_correct"] = is_correct
+
+    if on_partial is None:
+        return await invoke_chain(chain, inputs)
+
+    async def stream() -> Feedback:
+        async for kind, value in stream_structured(chain, inputs, ["feedback"]):
+            if kind == "partial":
+                on_partial(value)
+            else:
+                return value
+
+    return await asyncio.wait_for(stream(), LLM_TIMEOUT)
+
+# Attempts at generating feedback for a submission before giving up
+FEEDBACK_MAX_ATTEMPTS = int(os.getenv("FEEDBACK_MAX_ATTEMPTS", 3))
+# Seconds before the first retry; doubled after every failed attempt
+FEEDBACK_RETRY_DELAY = float(os.getenv("FEEDBACK_RETRY_DELAY", 2))
+
+# A pending or running feedback job whose submission row has not been
+# touched for this long is taken to have lost its server process and is
+# resumed by another one. Must exceed LLM_TIMEOUT plus the longest retry delay.
+FEEDBACK_JOB_STALE_AFTER = float(os.getenv("FEEDBACK_JOB_STALE_AFTER", 300))
+# Seconds between looks for stale feedback jobs
+FEEDBACK_JOB_SWEEP_INTERVAL = float(os.getenv("FEEDBACK_JOB_SWEEP_INTERVAL", 60))
+
+# Keep references to running feedback jobs so they are not garbage collected
+feedback_jobs: Set[asyncio.Task] = set()
+# Streams feedback progress from jobs to /api/feedback/{question_id}/stream, keyed by attempt id
+feedback_events = Broadcaster()
+
+@app.post("/api/submit", response_model=SubmitResponse)
 async def submit(
     request: SubmitRequest,
     token_payload: dict = Depends(get_token_from_header),
     db: Session = Depends(get_db)
 ):
+    """
+    Judge and record a submission, then return right away. Feedback is
+    generated by a background job; poll /api/feedback/{question_id} for it.
+    """
     user = db.query(DBUser).filter(DBUser.google_id == token_payload["sub"]).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    question = resolve_question(db, request.question_id, request.question)
+
     # Find the existing solved question record
     solved_question = (
         db.query(DBUserSolvedQuestion)
         .filter(
             DBUserSolvedQuestion.user_id == user.id,
-            DBUserSolvedQuestion.question_id == request.question.id
+            DBUserSolvedQuestion.question_id == question.id
         )
         .first()
     )
@@ -511,24 +1018,305 @@ async def submit(
     if not solved_question:
         raise HTTPException(status_code=404, detail="Question attempt not found")
 
-    is_correct = all(
-        result.actualOutput == tc.expectedOutput 
-        for tc, result in zip(request.question.testCases, request.test_results)
-    )
-    
-    # Generate feedback using existing code
-    feedback = generate_feedback(request, is_correct)
+    # Judge the submission on the server rather than trusting client-sent results.
+    # Unchanged code that was just run through /api/run_tests is answered from the result cache.
+    test_results = (await run_scheduled(
+        token_payload["sub"],
+        request.programming_language,
+        request.code,
+        question.testCases
+    )).results
+
+    passed = passed_tests(question.testCases, test_results)
+    is_correct = all(passed)
+    # The same code (up to comments and whitespace) with the same outcomes gets the same feedback
+    cached_feedback = feedback_cache.get(db, question.id, request.programming_language, request.code, passed)
+    feedback_status = FeedbackStatus.PENDING if cached_feedback is None else FeedbackStatus.READY
     
-    # Update the existing record
+    # Update the existing record; on a cache miss the feedback is filled in by the job
     solved_question.user_code = request.code
-    solved_question.test_results = [tr.dict() for tr in request.test_results]
+    solved_question.test_results = [tr.dict() for tr in test_results]
     solved_question.is_correct = is_correct
-    solved_question.feedback = feedback.dict()
+    solved_question.feedback = pending_feedback(is_correct) if cached_feedback is None else cached_feedback.dict()
+    solved_question.feedback_status = feedback_status.value
+    solved_question.feedback_attempts = 0
+    solved_question.feedback_error = None
+    # A newer submission supersedes any job still working on an older one
+    solved_question.feedback_job_id = str(uuid.uuid4())
     solved_question.solved_at = datetime.utcnow()  # Update the timestamp
     
     db.commit()
+
+    if cached_feedback is None:
+        start_feedback_job(solved_question.id, solved_question.feedback_job_id, request.programming_language)
     
-    return feedback
+    return SubmitResponse(
+        isCorrect=is_correct,
+        testResults=test_results,
+        feedbackStatus=feedback_status,
+        feedback=cached_feedback
+    )
+
+def passed_tests(test_cases: List[TestCase], test_results: List[TestCaseResult]) -> List[bool]:
+    # Performance test cases must also have stayed within their time and memory limits
+    return [
+        result.actualOutput == tc.expectedOutput
+        and (not tc.performance or result.verdict == Verdict.PASSED)
+        for tc, result in zip(test_cases, test_results)
+    ]
+
+def pending_feedback(is_correct: bool) -> dict:
+    return Feedback(
+        isCorrect=is_correct,
+        feedback="Feedback is being generated...",
+        strengths=[],
+        weaknesses=[]
+    ).dict()
+
+def start_feedback_job(attempt_id: int, job_id: str, programming_language: str):
+    task = asyncio.create_task(run_feedback_job(attempt_id, job_id, programming_language))
+    feedback_jobs.add(task)
+    task.add_done_callback(feedback_jobs.discard)
+
+async def run_feedback_job(attempt_id: int, job_id: str, programming_language: str):
+    """
+    Generate feedback for a recorded submission, retrying with exponential
+    backoff, and store it with its status. Everything is read back from the
+    database, so jobs interrupted by a restart can be resumed. The job stops
+    quietly if the attempt has been resubmitted in the meantime.
+    """
+    delay = FEEDBACK_RETRY_DELAY
+    for attempt in range(1, FEEDBACK_MAX_ATTEMPTS + 1):
+        db = SessionLocal()
+        try:
+            solved_question = (
+                db.query(DBUserSolvedQuestion)
+                .filter(
+                    DBUserSolvedQuestion.id == attempt_id,
+                    DBUserSolvedQuestion.feedback_job_id == job_id
+                )
+                .first()
+            )
+            if solved_question is None:
+                return
+            solved_question.feedback_status = FeedbackStatus.RUNNING.value
+            solved_question.feedback_attempts = attempt
+            db.commit()
+            feedback_events.publish(
+                attempt_id, "status", {"status": FeedbackStatus.RUNNING.value, "attempts": attempt}
+            )
+
+            question = question_cache.get(db, solved_question.question_id)
+            test_results = [TestCaseResult(**tr) for tr in solved_question.test_results]
+            try:
+                feedback = await generate_feedback(
+                    programming_language,
+                    solved_question.user_code,
+                    question,
+                    test_results,
+                    solved_question.is_correct,
+                    on_partial=lambda partial: feedback_events.publish(attempt_id, "partial", partial)
+                )
+            except Exception as e:
+                print(f"Feedback attempt {attempt} for submission {attempt_id} failed: {str(e)}")
+                error = str(e) or type(e).__name__
+                feedback = None
+
+            # Re-check ownership: the attempt may have been resubmitted while the LLM was working
+            db.refresh(solved_question)
+            if solved_question.feedback_job_id != job_id:
+                return
+            if feedback is not None:
+                solved_question.feedback = feedback.dict()
+                solved_question.feedback_status = FeedbackStatus.READY.value
+                solved_question.feedback_error = None
+                db.commit()
+                feedback_events.publish(
+                    attempt_id, "feedback", {"id": attempt_id, "feedback": feedback.dict()}, final=True
+                )
+                try:
+                    feedback_cache.put(
+                        db,
+                        question.id,
+                        programming_language,
+                        solved_question.user_code,
+                        passed_tests(question.testCases, test_results),
+                        feedback
+                    )
+                except Exception as e:
+                    db.rollback()
+                    print(f"Failed to cache feedback for submission {attempt_id}: {str(e)}")
+                return
+            final = attempt == FEEDBACK_MAX_ATTEMPTS
+            solved_question.feedback_status = FeedbackStatus.FAILED.value if final else FeedbackStatus.PENDING.value
+            solved_question.feedback_error = error
+            db.commit()
+            if final:
+                feedback_events.publish(attempt_id, "error", {"detail": error}, final=True)
+                return
+            feedback_events.publish(
+                attempt_id, "status", {"status": FeedbackStatus.PENDING.value, "attempts": attempt, "error": error}
+            )
+        finally:
+            db.close()
+        await asyncio.sleep(delay)
+        delay *= 2
+
+def claim_stale_feedback_jobs(db: Session) -> List[Tuple[int, str, str]]:
+    """
+    Take over the pending and running feedback jobs nobody has touched for
+    FEEDBACK_JOB_STALE_AFTER seconds, in one UPDATE ... RETURNING so that two
+    server processes never claim the same job. Claimed jobs get a new job id,
+    so a previous owner that is somehow still alive stops at its next
+    ownership check. Returns (attempt id, job id, programming language).
+    """
+    job_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(DBUserSolvedQuestion)
+        .where(
+            DBUserSolvedQuestion.question_id == DBQuestion.id,
+            DBUserSolvedQuestion.feedback_status.in_([FeedbackStatus.PENDING.value, FeedbackStatus.RUNNING.value]),
+            DBUserSolvedQuestion.feedback_updated_at < now - timedelta(seconds=FEEDBACK_JOB_STALE_AFTER)
+        )
+        .values(feedback_job_id=job_id, feedback_updated_at=now)
+        # The table column: ORM attributes of the joined table are left out of RETURNING
+        .returning(DBUserSolvedQuestion.id, DBQuestion.__table__.c.programming_language)
+    ).all()
+    db.commit()
+    return [(attempt_id, job_id, programming_language) for attempt_id, programming_language in claimed]
+
+async def sweep_feedback_jobs():
+    """Resume feedback jobs whose server process stopped, e.g. in a restart, every FEEDBACK_JOB_SWEEP_INTERVAL seconds."""
+    while True:
+        db = SessionLocal()
+        try:
+            for attempt_id, job_id, programming_language in claim_stale_feedback_jobs(db):
+                start_feedback_job(attempt_id, job_id, programming_language)
+        except Exception as e:
+            db.rollback()
+            print(f"Error resuming feedback jobs: {str(e)}")
+        finally:
+            db.close()
+        await asyncio.sleep(FEEDBACK_JOB_SWEEP_INTERVAL)
+
+feedback_sweeper: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def resume_feedback_jobs():
+    # Jobs of a process that is still running stay with it: only stale ones are claimed
+    global feedback_sweeper
+    feedback_sweeper = asyncio.create_task(sweep_feedback_jobs())
+
+@app.get("/api/feedback/{question_id}", response_model=FeedbackStatusResponse)
+async def get_feedback(
+    question_id: int,
+    token_payload: dict = Depends(get_token_from_header),
+    db: Session = Depends(get_db)
+):
+    """Status of the feedback for the user's latest submission of a question."""
+    user = db.query(DBUser).filter(DBUser.google_id == token_payload["sub"]).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    solved_question = (
+        db.query(DBUserSolvedQuestion)
+        .filter(
+            DBUserSolvedQuestion.user_id == user.id,
+            DBUserSolvedQuestion.question_id == question_id
+        )
+        .first()
+    )
+    if not solved_question:
+        raise HTTPException(status_code=404, detail="Question attempt not found")
+
+    return FeedbackStatusResponse(
+        status=solved_question.feedback_status,
+        attempts=solved_question.feedback_attempts,
+        feedback=Feedback(**solved_question.feedback),
+        error=solved_question.feedback_error
+    )
+
+# Seconds between database checks while waiting for feedback events, which
+# only reach subscribers in the server process running the job
+FEEDBACK_STREAM_POLL_INTERVAL = 2
+
+@app.get("/api/feedback/{question_id}/stream")
+async def stream_feedback(
+    question_id: int,
+    token_payload: dict = Depends(get_token_from_header),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events for the feedback on the user's latest submission:
+    "partial" events with the feedback text as the LLM writes it, "status"
+    events when a job starts or retries, then a final "feedback" event with
+    the validated Feedback and the attempt's database id, or "error".
+    """
+    user = db.query(DBUser).filter(DBUser.google_id == token_payload["sub"]).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    solved_question = (
+        db.query(DBUserSolvedQuestion)
+        .filter(
+            DBUserSolvedQuestion.user_id == user.id,
+            DBUserSolvedQuestion.question_id == question_id
+        )
+        .first()
+    )
+    if not solved_question:
+        raise HTTPException(status_code=404, detail="Question attempt not found")
+
+    return StreamingResponse(
+        feedback_stream(solved_question.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def finished_feedback_event(attempt_id: int) -> Optional[str]:
+    """The final event for an attempt whose job has finished, or None while it is still going."""
+    db = SessionLocal()
+    try:
+        solved_question = db.query(DBUserSolvedQuestion).filter(DBUserSolvedQuestion.id == attempt_id).first()
+        if solved_question is None:
+            return sse_event("error", {"detail": "Question attempt not found"})
+        if solved_question.feedback_status == FeedbackStatus.READY.value:
+            return sse_event("feedback", {"id": attempt_id, "feedback": solved_question.feedback})
+        if solved_question.feedback_status == FeedbackStatus.FAILED.value:
+            return sse_event("error", {"detail": solved_question.feedback_error})
+        return None
+    finally:
+        db.close()
+
+async def feedback_stream(attempt_id: int):
+    # Subscribe before checking the database so the final event cannot be missed
+    queue = feedback_events.subscribe(attempt_id)
+    try:
+        finished = finished_feedback_event(attempt_id)
+        if finished is not None:
+            yield finished
+            return
+
+        latest = feedback_events.latest(attempt_id)
+        if latest is not None:
+            yield sse_event(*latest)
+
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), FEEDBACK_STREAM_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                # The job may be running in another server process
+                finished = finished_feedback_event(attempt_id)
+                if finished is not None:
+                    yield finished
+                    return
+                continue
+            yield sse_event(event, data)
+            if event in ("feedback", "error"):
+                return
+    finally:
+        feedback_events.unsubscribe(attempt_id, queue)
 
 # Update get_solved_questions endpoint
 @app.get("/api/solved_questions")
@@ -605,6 +1393,21 @@ async def log_requests(request: Request, call_next):
         print(f"Request Error: {str(e)}")
         raise
 
+LANGUAGE_DEFAULTS = {
+    "ocaml": {
+        "difficulty": "Easy",
+        "topics": ["Recursive Functions", "Lists"]
+    },
+    "java": {
+        "difficulty": "Easy", 
+        "topics": ["Lists", "Maps", "Sets"]
+    },
+    "c": {
+        "difficulty": "Easy",
+        "topics": ["Arrays", "Strings", "Dynamic Memory Allocation"]
+    }
+}
+
 @app.get("/api/user/settings/{language}")
 async def get_user_settings(
     language: str,
@@ -615,27 +1418,12 @@ async def get_user_settings(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    language_defaults = {
-        "ocaml": {
-            "difficulty": "Easy",
-            "topics": ["Recursive Functions", "Lists"]
-        },
-        "java": {
-            "difficulty": "Easy", 
-            "topics": ["Lists", "Maps", "Sets"]
-        },
-        "c": {
-            "difficulty": "Easy",
-            "topics": ["Arrays", "Strings", "Dynamic Memory Allocation"]
-        }
-    }
-
     # Use default settings if user has no settings, otherwise use user's settings for the language
     # (falling back to defaults if the language isn't in user settings)
     if user.question_settings is None:
-        settings = language_defaults.get(language)
+        settings = LANGUAGE_DEFAULTS.get(language)
     else:
-        settings = user.question_settings.get(language, language_defaults.get(language))
+        settings = user.question_settings.get(language, LANGUAGE_DEFAULTS.get(language))
     
     return LanguageSettings(**settings)
 
@@ -658,6 +1446,22 @@ async def update_user_settings(
     
     return {"status": "success"}
 
+@app.get("/api/metrics")
+async def get_metrics(token_payload: dict = Depends(get_token_from_header)):
+    return {
+        "artifact_cache": artifact_cache.stats(),
+        "jvm_pool": jvm_pool.stats(),
+        "workspaces": workspaces.stats(),
+        "scheduler": scheduler.stats(),
+        "result_cache": result_cache.stats(),
+        "question_cache": question_cache.stats(),
+        "question_pool": question_pool.stats(),
+        "llm_chains": llm_chains.stats(),
+        "question_index": question_index.stats(),
+        "feedback_prompts": compaction_stats.stats(),
+        "feedback_cache": feedback_cache.stats()
+    }
+
 # if __name__ == "__main__":
 #     import uvicorn
 #     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
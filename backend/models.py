@@ -1,13 +1,31 @@
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from datetime import datetime
+from enum import Enum
 
 class TestCase(BaseModel):
     input: str
     expectedOutput: str
+    # Performance test cases use large inputs and are also judged on CPU time and memory
+    performance: bool = False
+    timeLimitSeconds: Optional[float] = None
+    memoryLimitMb: Optional[int] = None
+
+class ResourceUsage(BaseModel):
+    wallTime: float  # seconds
+    userTime: float  # CPU seconds in user mode
+    systemTime: float  # CPU seconds in kernel mode
+    maxRssKb: Optional[int] = None  # peak resident memory
 
 class TestCaseResult(TestCase):
     actualOutput: str
+    # True when the program was stopped for exceeding the output cap
+    truncated: bool = False
+    usage: Optional[ResourceUsage] = None
+    # OK, WA, TLE, MLE, RE or CE (see execution/judge.py)
+    verdict: Optional[str] = None
+    # True when the run was answered from the server's result cache
+    cached: bool = False
 
 class QuestionWithoutTestCases(BaseModel):
     id: Optional[int] = None
@@ -33,10 +51,32 @@ class Feedback(BaseModel):
     strengths: List[str]
     weaknesses: List[str]
 
+class FeedbackStatus(str, Enum):
+    PENDING = "pending"  # queued, or waiting to retry
+    RUNNING = "running"
+    READY = "ready"
+    FAILED = "failed"  # gave up after the last retry
+
+class SubmitResponse(BaseModel):
+    isCorrect: bool
+    testResults: List[TestCaseResult]
+    feedbackStatus: FeedbackStatus
+    # Set right away when the feedback was found in the feedback cache
+    feedback: Optional[Feedback] = None
+
+class FeedbackStatusResponse(BaseModel):
+    status: FeedbackStatus
+    attempts: int
+    # A placeholder until the status is "ready"
+    feedback: Feedback
+    error: Optional[str] = None
+
 class QuestionParams(BaseModel):
     difficulty: str
     topics: List[str]
     programming_language: str
+    # Ask the generator for large-input test cases with time and memory limits
+    performance_tests: bool = False
 
 class SolvedQuestion(BaseModel):
     question: Question
@@ -50,17 +90,36 @@ class SessionInfo(BaseModel):
 
 class RunTestsRequest(BaseModel):
     code: str
-    question: Question
+    # Test cases are loaded on the server from question_id. A full question
+    # is still accepted from older clients; only its id is used if it has one.
+    question_id: Optional[int] = None
+    question: Optional[Question] = None
     programming_language: str
 
 class SubmitRequest(BaseModel):
     code: str
-    question: Question
-    test_results: List[TestCaseResult]
+    question_id: Optional[int] = None
+    question: Optional[Question] = None
+    # Ignored: submissions are re-judged on the server. Kept for older clients.
+    test_results: List[TestCaseResult] = []
     programming_language: str
 
 class RunTestsResponse(BaseModel):
     results: List[TestCaseResult]
+    # Only set when the submission was compiled by this request
+    compileUsage: Optional[ResourceUsage] = None
+
+class TestCaseResultEvent(BaseModel):
+    type: str = "result"
+    index: int
+    result: TestCaseResult
+
+class RunTestsSummaryEvent(BaseModel):
+    type: str = "summary"
+    passed: int
+    total: int
+    results: List[TestCaseResult]
+    compileUsage: Optional[ResourceUsage] = None
 
 class LanguageSettings(BaseModel):
     difficulty: str
@@ -21,7 +21,7 @@ The response should contain a well-structured question with the following compon
    - **Expected Output** (string): The correct output that the OCaml program should produce for the given input.
 
 4. **Hint**: Step-by-step hints for solving the problem (without any code) in Markdown format. Include numbered steps to help guide the student logically toward the solution.
-
+{performance_instructions}
 **Avoidance List**: Ensure that the question does not overlap with the following list:
 {avoid_questions}
 
@@ -155,7 +155,7 @@ You are an expert programmer specializing in Object-Oriented Programming (OOP).
    - **Input**: The command line arguments as a single string (excluding the `java Main` command).  
    - **Expected Output**: The output for the given input as a single string.
    - Ensure that each test case is independent of others, and the program's output should only depend on the inputs provided during a single execution.
-
+{performance_instructions}
 #### 3. **Formatting Instructions**
 {format_instructions}
 """
@@ -183,12 +183,20 @@ The response should contain a well-structured question with the following compon
    - **Expected Output** (string): The correct output that the C program should produce for the given input.
 
 4. **Hint**: Step-by-step hints for solving the problem (without any code) in Markdown format. Include numbered steps to help guide the student logically toward the solution.
-
+{performance_instructions}
 **Avoidance List**: Ensure that the question does not overlap with the following list:
 {avoid_questions}
 
 {format_instructions}"""
 
+PERFORMANCE_TEST_CASE_INSTRUCTIONS = """
+**Performance Test Cases**: In addition to the regular test cases, include one or two performance test cases that check the efficiency of the solution:
+   - Set **performance** to `true`, and set **timeLimitSeconds** (CPU seconds, e.g. `1.0`) and **memoryLimitMb** (e.g. `64`) so that an efficient solution passes comfortably while a naive one does not.
+   - Command-line arguments cannot hold large data, so the input should be a size parameter (for example `n=1000000`) from which the program deterministically builds the large input as the question describes. State this input-generation rule in the problem text.
+   - The expected output must be short (for example a single number or checksum) and exactly correct for the given input.
+   - Regular test cases must leave **performance** as `false`.
+"""
+
 QUESTION_GENERATION_PROMPT_TEMPLATES = {
     "ocaml": OCAML_QUESTION_GENERATION_PROMPT_TEMPLATE,
     "java": JAVA_QUESTION_GENERATION_PROMPT_TEMPLATE,
@@ -0,0 +1,133 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, NamedTuple
+
+# Most past questions listed in a generation prompt's avoid list
+AVOID_LIST_SIZE = int(os.getenv("AVOID_LIST_SIZE", 20))
+# Most questions kept in the similarity index (least recently used are dropped)
+QUESTION_INDEX_MAX_DOCS = int(os.getenv("QUESTION_INDEX_MAX_DOCS", 50000))
+# Characters of the question text indexed along with its name
+INDEXED_TEXT_CHARS = 500
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "be", "by", "for", "from", "given", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "using", "with", "write", "you", "your",
+}
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOP_WORDS and len(word) > 1]
+
+def question_terms(name: str, text: str = "", language: str = "", difficulty: str = "", topics: Iterable[str] = ()) -> Counter:
+    """Weighted terms of a question: its name counts double, and language, difficulty and topics become tags."""
+    terms = Counter(tokenize(name) * 2 + tokenize(text[:INDEXED_TEXT_CHARS]))
+    if language:
+        terms[f"lang:{language.lower()}"] += 1
+    if difficulty:
+        terms[f"difficulty:{difficulty.lower()}"] += 1
+    for topic in topics:
+        terms[f"topic:{topic.lower()}"] += 1
+        terms.update(tokenize(topic))
+    return terms
+
+class PastQuestion(NamedTuple):
+    """A stored question as loaded for the avoid list; `text` may be just its first INDEXED_TEXT_CHARS."""
+    id: int
+    name: str
+    text: str
+    language: str
+    difficulty: str
+    topics: List[str]
+
+    def terms(self) -> Counter:
+        return question_terms(self.name, self.text, self.language, self.difficulty, self.topics)
+
+class QuestionIndex:
+    """
+    Local, incrementally maintained TF-IDF index over questions, used to pick
+    the past questions most similar to a new request for the prompt's avoid
+    list. Questions are added as they are served, and past questions that are
+    not indexed yet (e.g. after a restart) are added from the stored details
+    passed to `most_similar`.
+    """
+
+    def __init__(self, max_docs: int = QUESTION_INDEX_MAX_DOCS):
+        self.max_docs = max_docs
+        self._lock = threading.Lock()
+        self._docs: "OrderedDict[int, Counter]" = OrderedDict()  # id -> terms
+        self._document_frequency: Counter = Counter()
+
+    def add(self, question_id: int, name: str, text: str = "", language: str = "", difficulty: str = "", topics: Iterable[str] = ()):
+        with self._lock:
+            self._add(question_id, question_terms(name, text, language, difficulty, topics))
+
+    def most_similar(
+        self,
+        candidates: List[PastQuestion],
+        language: str,
+        difficulty: str,
+        topics: Iterable[str],
+        k: int = AVOID_LIST_SIZE
+    ) -> List[str]:
+        """
+        Names of the `k` candidate questions most similar to a request for `language`, `difficulty` and `topics`. Ties go to the
+        most recent (highest id).
+        """
+        if len(candidates) <= k:
+            return [candidate.name for candidate in candidates]
+
+        query = question_terms("", language=language, difficulty=difficulty, topics=topics)
+        with self._lock:
+            for candidate in candidates:
+                if candidate.id in self._docs:
+                    self._docs.move_to_end(candidate.id)
+                else:
+                    self._add(candidate.id, candidate.terms())
+            query_vector = self._weights(query)
+            scored = [
+                (_cosine(query_vector, self._weights(self._docs.get(candidate.id) or candidate.terms())), candidate.id, candidate.name)
+                for candidate in candidates
+            ]
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [name for _, _, name in scored[:k]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": len(self._document_frequency),
+                "max_documents": self.max_docs,
+            }
+
+    def _add(self, question_id: int, terms: Counter):
+        previous = self._docs.pop(question_id, None)
+        if previous is not None:
+            self._forget(previous)
+        self._docs[question_id] = terms
+        self._document_frequency.update(terms.keys())
+        while len(self._docs) > self.max_docs:
+            _, evicted = self._docs.popitem(last=False)
+            self._forget(evicted)
+
+    def _forget(self, terms: Counter):
+        for term in terms:
+            self._document_frequency[term] -= 1
+            if self._document_frequency[term] <= 0:
+                del self._document_frequency[term]
+
+    def _weights(self, terms: Counter) -> Dict[str, float]:
+        # Smoothed inverse document frequency, always positive
+        documents = len(self._docs)
+        return {
+            term: (1 + math.log(count)) * (math.log((1 + documents) / (1 + self._document_frequency[term])) + 1)
+            for term, count in terms.items()
+        }
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    dot = sum(weight * b.get(term, 0.0) for term, weight in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+question_index = QuestionIndex()
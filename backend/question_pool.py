@@ -0,0 +1,162 @@
+import asyncio
+import os
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from models import Question, QuestionParams
+
+# Ready questions kept per (language, difficulty, topics); 0 (the default)
+# disables the pool. Pooled questions live in memory only, so every server
+# process fills its own pool on startup and loses it on shutdown.
+QUESTION_POOL_SIZE = int(os.getenv("QUESTION_POOL_SIZE", 0))
+# Most (language, difficulty, topics) combinations kept filled at once
+QUESTION_POOL_MAX_KEYS = int(os.getenv("QUESTION_POOL_MAX_KEYS", 12))
+# Requests needed before a non-default combination is kept filled
+QUESTION_POOL_MIN_REQUESTS = int(os.getenv("QUESTION_POOL_MIN_REQUESTS", 2))
+# Seconds to wait after a failed generation before trying again
+QUESTION_POOL_RETRY_DELAY = 30
+# Most (language, difficulty, topics) combinations whose requests are counted;
+# the least recently requested are forgotten beyond this
+QUESTION_POOL_MAX_TRACKED = 256
+
+# Names of recently generated questions per key, passed to the generator so
+# the pool does not fill up with the same question
+RECENT_NAMES = 50
+
+PoolKey = Tuple[str, str, Tuple[str, ...]]
+Generator = Callable[[QuestionParams, List[str]], Awaitable[Question]]
+
+def pool_key(params: QuestionParams) -> PoolKey:
+    return (params.programming_language, params.difficulty, tuple(sorted(params.topics)))
+
+class QuestionPool:
+    """
+    Keeps a few ready, validated questions for the default settings of each
+    language and for the most requested (language, difficulty, topics)
+    combinations, so /api/generate_question can answer without waiting on
+    the LLM. A background task tops the pools up after every request.
+    Pooled questions are not in the database until they are served.
+    """
+
+    def __init__(self, size: int = QUESTION_POOL_SIZE, max_keys: int = QUESTION_POOL_MAX_KEYS):
+        self.size = size
+        self.max_keys = max_keys
+        self._pools: Dict[PoolKey, Deque[Question]] = {}
+        self._recent: Dict[PoolKey, Deque[str]] = {}
+        self._params: Dict[PoolKey, QuestionParams] = {}
+        self._seeds: List[PoolKey] = []
+        self._requests: "OrderedDict[PoolKey, int]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self, generate: Generator, seeds: Iterable[QuestionParams]):
+        """Start the refill task on the running event loop."""
+        if not self.enabled or self._task is not None:
+            return
+        for params in seeds:
+            key = pool_key(params)
+            self._params[key] = params
+            self._seeds.append(key)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._refill(generate))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def take(self, params: QuestionParams, avoid_names: Iterable[str]) -> Optional[Question]:
+        """
+        Pop a ready question for these settings whose name is not in
+        `avoid_names`, or None on a miss. Either way the pool is refilled in
+        the background.
+        """
+        if not self.enabled or params.performance_tests:
+            return None
+        key = pool_key(params)
+        self._count_request(key, params)
+
+        avoid = {name.strip().lower() for name in avoid_names}
+        pool = self._pools.get(key, ())
+        question = next((q for q in pool if q.name.strip().lower() not in avoid), None)
+        if question is None:
+            self.misses += 1
+        else:
+            pool.remove(question)
+            self.hits += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return question
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "generated": self.generated,
+            "failures": self.failures,
+            "target_depth": self.size,
+            "depth": {
+                f"{language}/{difficulty}/{','.join(topics)}": len(pool)
+                for (language, difficulty, topics), pool in self._pools.items()
+            },
+        }
+
+    def _count_request(self, key: PoolKey, params: QuestionParams):
+        self._requests[key] = self._requests.get(key, 0) + 1
+        self._requests.move_to_end(key)
+        self._params.setdefault(key, QuestionParams(**params.dict()))
+        while len(self._requests) > QUESTION_POOL_MAX_TRACKED:
+            forgotten, _ = self._requests.popitem(last=False)
+            if forgotten not in self._seeds:
+                self._params.pop(forgotten, None)
+                self._recent.pop(forgotten, None)
+                self._pools.pop(forgotten, None)
+
+    def _tracked_keys(self) -> List[PoolKey]:
+        keys = list(self._seeds)
+        for key, count in sorted(self._requests.items(), key=lambda item: item[1], reverse=True):
+            if len(keys) >= self.max_keys or count < QUESTION_POOL_MIN_REQUESTS:
+                break
+            if key not in keys:
+                keys.append(key)
+        return keys
+
+    async def _refill(self, generate: Generator):
+        while True:
+            # Fill the emptiest pool first, one question at a time
+            pending = [key for key in self._tracked_keys() if len(self._pools.get(key, ())) < self.size]
+            if not pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            key = min(pending, key=lambda k: len(self._pools.get(k, ())))
+            recent = self._recent.setdefault(key, deque(maxlen=RECENT_NAMES))
+            try:
+                question = await generate(self._params[key], list(recent))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                print(f"Question pool refill failed for {key}: {str(e)}")
+                await asyncio.sleep(QUESTION_POOL_RETRY_DELAY)
+                continue
+            recent.append(question.name)
+            self._pools.setdefault(key, deque()).append(question)
+            self.generated += 1
+
+question_pool = QuestionPool()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from langchain_core.utils.json import parse_json_markdown
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_structured(chain, inputs: dict, fields: List[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream a call to an llm_chains.Chain. While tokens arrive, the partial
+    JSON is parsed and ("partial", {field: text so far}) is yielded whenever
+    one of the string `fields` has grown. Ends with ("final", parsed object),
+    validated by the chain's parser exactly as a non-streamed call would be.
+    """
+    buffer = ""
+    sent: Dict[str, str] = {}
+    async for text in chain.astream_text(inputs):
+        buffer += text
+        try:
+            partial = parse_json_markdown(buffer)
+        except ValueError:
+            continue
+        if not isinstance(partial, dict):
+            continue
+        update = {
+            field: partial[field]
+            for field in fields
+            if isinstance(partial.get(field), str) and partial[field] != sent.get(field)
+        }
+        if update:
+            sent.update(update)
+            yield "partial", update
+    yield "final", chain.parser.parse(buffer)
+
+class Broadcaster:
+    """
+    In-process fan-out of events per key (e.g. a submission id) to any number
+    of subscribers. The latest partial event is kept so late subscribers can
+    catch up. Only reaches subscribers in the same server process.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[Any, Set[asyncio.Queue]] = {}
+        self._latest: Dict[Any, Tuple[str, Any]] = {}
+
+    def subscribe(self, key) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(key, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, key, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(key)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[key]
+
+    def latest(self, key) -> Optional[Tuple[str, Any]]:
+        return self._latest.get(key)
+
+    def publish(self, key, event: str, data: Any, final: bool = False):
+        if final:
+            self._latest.pop(key, None)
+        else:
+            self._latest[key] = (event, data)
+        for queue in self._subscribers.get(key, ()):
+            queue.put_nowait((event, data))
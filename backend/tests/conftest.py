@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# main reads these at import time
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "test-client")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("ARTIFACT_CACHE_DIR", tempfile.mkdtemp(prefix="test-artifacts-"))
+os.environ.setdefault("EXECUTION_WORKSPACE_ROOT", tempfile.mkdtemp(prefix="test-workspaces-"))
+os.environ.setdefault("QUESTION_POOL_SIZE", "0")
+
+# The tests run without PostgreSQL: skip creating tables when main is imported
+import database.config  # noqa: E402
+
+database.config.init_db = lambda: None
+
+import main  # noqa: E402
+
+class FakeQuery:
+    def __init__(self, result):
+        self.result = result
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def join(self, *args, **kwargs):
+        return self
+
+    def first(self):
+        return self.result
+
+    def all(self):
+        return [] if self.result is None else [self.result]
+
+class FakeSession:
+    """Stands in for a SQLAlchemy session: query(Model) returns the object registered for Model."""
+
+    def __init__(self, objects=None):
+        self.objects = objects or {}
+
+    def query(self, model, *args):
+        return FakeQuery(self.objects.get(model))
+
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        pass
+
+    def refresh(self, obj):
+        pass
+
+    def rollback(self):
+        pass
+
+    def execute(self, statement):
+        pass
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def auth_headers():
+    token = main.create_session_token({"sub": "test-user", "email": "test@example.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def fake_db():
+    session = FakeSession()
+    main.app.dependency_overrides[main.get_db] = lambda: session
+    yield session
+    main.app.dependency_overrides.pop(main.get_db, None)
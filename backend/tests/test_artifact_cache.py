@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from execution.artifact_cache import STAGING_PREFIX, ArtifactCache
+
+def builder(ok=True, stderr="", size=10):
+    calls = []
+
+    def build(directory):
+        calls.append(directory)
+        with open(os.path.join(directory, "program"), "wb") as f:
+            f.write(b"x" * size)
+        return ok, stderr
+    return build, calls
+
+def test_second_acquire_is_a_hit(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    build, calls = builder()
+    key = ArtifactCache.key("c", ["gcc"], "int main() {}")
+
+    first = cache.acquire(key, build)
+    cache.release(first)
+    second = cache.acquire(key, build)
+    cache.release(second)
+
+    assert len(calls) == 1
+    assert second.ok and second.path == first.path
+    assert os.path.isfile(os.path.join(second.path, "program"))
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+def test_compile_failures_are_cached(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    build, calls = builder(ok=False, stderr="main.c:1: error")
+    key = ArtifactCache.key("c", ["gcc"], "int main() {")
+
+    for _ in range(2):
+        artifact = cache.acquire(key, build)
+        cache.release(artifact)
+        assert not artifact.ok
+        assert artifact.stderr == "main.c:1: error"
+    assert len(calls) == 1
+
+def test_raised_failures_are_not_cached(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    key = ArtifactCache.key("c", ["gcc"], "int main() {}")
+
+    def timed_out(directory):
+        raise TimeoutError("compiler timed out")
+    with pytest.raises(TimeoutError):
+        cache.acquire(key, timed_out)
+    assert not any(name.startswith(STAGING_PREFIX) for name in os.listdir(tmp_path))
+
+    build, calls = builder()
+    cache.release(cache.acquire(key, build))
+    assert len(calls) == 1
+
+def test_least_recently_used_unpinned_entries_are_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=2500)
+    keys = [ArtifactCache.key("c", ["gcc"], str(i)) for i in range(3)]
+    pinned = cache.acquire(keys[0], builder(size=1000)[0])
+    cache.release(cache.acquire(keys[1], builder(size=1000)[0]))
+    cache.release(cache.acquire(keys[2], builder(size=1000)[0]))
+
+    # keys[0] is the oldest but still in use, so keys[1] goes instead
+    assert os.path.isdir(pinned.path)
+    assert not os.path.exists(os.path.join(tmp_path, keys[1]))
+    assert cache.stats()["evictions"] == 1
+
+    cache.release(pinned)
+    cache.release(cache.acquire(keys[1], builder(size=1000)[0]))
+    assert not os.path.exists(pinned.path)
+
+def test_entries_survive_a_restart(tmp_path):
+    key = ArtifactCache.key("c", ["gcc"], "int main() {}")
+    build, calls = builder()
+    cache = ArtifactCache(str(tmp_path))
+    cache.release(cache.acquire(key, build))
+
+    restarted = ArtifactCache(str(tmp_path))
+    artifact = restarted.acquire(key, build)
+    restarted.release(artifact)
+    assert artifact.ok
+    assert len(calls) == 1
@@ -0,0 +1,38 @@
+from database.feedback_cache import FeedbackCache, normalize_source
+
+def test_comments_and_whitespace_are_ignored():
+    original = """
+#include <stdio.h>
+// Print the answer
+int main() {
+    /* the answer */ printf("%d\\n", 42);
+    return 0;
+}
+"""
+    reformatted = '#include <stdio.h>\nint main(){printf("%d\\n",42);return 0;}'
+    assert normalize_source("c", original) == normalize_source("c", reformatted)
+
+def test_literals_are_kept_as_written():
+    assert normalize_source("c", 'puts("a  b");') != normalize_source("c", 'puts("a b");')
+    # Comment markers inside literals are not comments
+    assert normalize_source("java", 'String s = "// not a comment";') == 'String s="// not a comment";'
+    assert normalize_source("ocaml", 'let s = {|(* kept *)|}') == 'let s={|(* kept *)|}'
+
+def test_operators_are_not_merged():
+    assert normalize_source("c", "x = a - -b;") != normalize_source("c", "x = a--b;")
+    assert normalize_source("c", "x = a - -b;") == "x=a- -b;"
+
+def test_ocaml_comments_nest_and_type_variables_are_not_literals():
+    assert normalize_source("ocaml", "let x (* outer (* inner *) still outer *) = 1") == "let x=1"
+    assert normalize_source("ocaml", "let id (x : 'a) : 'a = x") == "let id(x:'a):'a=x"
+
+def test_c_preprocessor_directives_keep_their_spacing():
+    assert normalize_source("c", "#define F (x)\nint y;") != normalize_source("c", "#define F(x)\nint y;")
+    assert normalize_source("c", "#define F (x)\nint  y;") == "#define F (x)\nint y;"
+
+def test_key_depends_on_normalized_code_and_test_outcomes():
+    key = FeedbackCache.key(1, "c", "int main() { return 0; }", [True, False])
+    assert key == FeedbackCache.key(1, "c", "int main(){return 0;} // done", [True, False])
+    assert key != FeedbackCache.key(1, "c", "int main() { return 0; }", [True, True])
+    assert key != FeedbackCache.key(2, "c", "int main() { return 0; }", [True, False])
+    assert key != FeedbackCache.key(1, "c", "int main() { return 1; }", [True, False])
@@ -0,0 +1,51 @@
+import signal
+
+from execution.judge import Verdict, judge
+from execution.process import ProcessResult, Usage
+
+def result(returncode=0, stdout="", stderr="", user_time=0.01, memory_limit_mb=None, max_rss_kb=1024):
+    return ProcessResult(
+        ["./program"],
+        returncode,
+        stdout=stdout,
+        stderr=stderr,
+        usage=Usage(wall_time=user_time, user_time=user_time, system_time=0.0, max_rss_kb=max_rss_kb),
+        memory_limit_mb=memory_limit_mb
+    )
+
+def test_sigxcpu_is_time_limit_exceeded_below_the_measured_limit():
+    # RLIMIT_CPU fired while the measured CPU time was still just under the limit
+    process = result(returncode=-signal.SIGXCPU, user_time=0.99)
+    assert judge(process, output_matches=True, cpu_limit=1.0) == Verdict.TIME_LIMIT_EXCEEDED
+    assert judge(process, output_matches=False, cpu_limit=1.0) == Verdict.TIME_LIMIT_EXCEEDED
+
+def test_cpu_time_over_the_limit_is_time_limit_exceeded():
+    process = result(user_time=1.5)
+    assert judge(process, output_matches=True, cpu_limit=1.0) == Verdict.TIME_LIMIT_EXCEEDED
+
+def test_sigxcpu_without_a_cpu_limit_is_a_runtime_error():
+    process = result(returncode=-signal.SIGXCPU)
+    assert judge(process, output_matches=False) == Verdict.RUNTIME_ERROR
+
+def test_refused_allocation_under_rlimit_is_memory_limit_exceeded():
+    # malloc returned NULL and the program exited 1 without touching much memory
+    process = result(returncode=1, memory_limit_mb=64, max_rss_kb=1084)
+    assert judge(process, output_matches=False, memory_limit_mb=64) == Verdict.MEMORY_LIMIT_EXCEEDED
+
+def test_static_data_over_rlimit_is_memory_limit_exceeded():
+    process = result(returncode=-signal.SIGSEGV, memory_limit_mb=64, max_rss_kb=600)
+    assert judge(process, output_matches=False, memory_limit_mb=64) == Verdict.MEMORY_LIMIT_EXCEEDED
+
+def test_out_of_memory_marker_is_memory_limit_exceeded():
+    # Java runs under -Xmx, not RLIMIT_DATA
+    process = result(returncode=1, stderr="Exception in thread \"main\" java.lang.OutOfMemoryError: Java heap space")
+    assert judge(process, output_matches=False, memory_limit_mb=64) == Verdict.MEMORY_LIMIT_EXCEEDED
+
+def test_successful_run_under_memory_limit_is_judged_by_output():
+    process = result(stdout="3", memory_limit_mb=64, max_rss_kb=63 * 1024)
+    assert judge(process, output_matches=True, memory_limit_mb=64) == Verdict.PASSED
+    assert judge(process, output_matches=False, memory_limit_mb=64) == Verdict.WRONG_ANSWER
+
+def test_crash_without_limits_is_a_runtime_error():
+    process = result(returncode=-signal.SIGSEGV)
+    assert judge(process, output_matches=False) == Verdict.RUNTIME_ERROR
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import httpx
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import llm_chains
+import main
+from database.models import DBUser, DBUserSolvedQuestion
+from database.question_cache import question_cache
+from models import Question, RunTestsResponse
+# Aliased so pytest does not try to collect them as test classes
+from models import TestCase as QuestionTestCase, TestCaseResult as QuestionTestCaseResult
+from tests.conftest import FakeSession
+
+pytestmark = pytest.mark.anyio
+
+LLM_DELAY = 1.0
+
+QUESTION = Question(
+    id=424242,
+    name="Sum two numbers",
+    text="Print the sum of the two arguments.",
+    hint="Parse both arguments.",
+    programming_language="c",
+    testCases=[QuestionTestCase(input="./main 1 2", expectedOutput="3")]
+)
+
+FEEDBACK = {"isCorrect": True, "feedback": "Looks good.", "strengths": ["Correct"], "weaknesses": []}
+
+class SlowChatModel(BaseChatModel):
+    """Answers after `delay` seconds without blocking the event loop, and records how many calls overlapped."""
+
+    delay: float
+    active: int = 0
+    max_active: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        # The feedback prompt's format instructions describe strengths, the question prompt's do not
+        if "strengths" in messages[-1].content:
+            text = json.dumps(FEEDBACK)
+        else:
+            text = QUESTION.json(exclude={"id", "programming_language"})
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return self._generate(messages, stop)
+
+@pytest.fixture
+def slow_llm():
+    model = SlowChatModel(delay=LLM_DELAY)
+    # The app's startup hooks do not run under ASGITransport, so the chains are built here
+    llm_chains.chains.update(llm_chains._build_chains(model))
+    yield model
+    llm_chains.chains.clear()
+
+async def test_generate_question_and_submit_feedback_overlap(slow_llm, fake_db, auth_headers, monkeypatch):
+    user = SimpleNamespace(id=1)
+    attempt = SimpleNamespace(id=7, question_id=QUESTION.id, feedback_status=None)
+    fake_db.objects = {DBUser: user, DBUserSolvedQuestion: attempt}
+    question_cache.put(QUESTION)
+
+    # Keep the database and code execution out of the way: only the LLM calls matter here
+    monkeypatch.setattr(main, "previous_questions", lambda db, user: [])
+    monkeypatch.setattr(main, "ready_question", lambda db, user, params, avoid_names: (None, None))
+    monkeypatch.setattr(main, "store_question", lambda db, user, params, question, db_question=None: question)
+    monkeypatch.setattr(main, "SessionLocal", lambda: FakeSession({DBUserSolvedQuestion: attempt}))
+
+    async def run_scheduled(user_id, language, code, test_cases):
+        return RunTestsResponse(results=[
+            QuestionTestCaseResult(input=tc.input, expectedOutput=tc.expectedOutput, actualOutput=tc.expectedOutput, verdict="OK")
+            for tc in test_cases
+        ])
+    monkeypatch.setattr(main, "run_scheduled", run_scheduled)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        started = time.monotonic()
+        generate = asyncio.create_task(client.post("/api/generate_question", headers=auth_headers, json={
+            "difficulty": "easy", "topics": ["arithmetic"], "programming_language": "c"
+        }))
+        submitted = await client.post("/api/submit", headers=auth_headers, json={
+            "code": "int main() { return 0; }", "question_id": QUESTION.id, "programming_language": "c"
+        })
+        submit_latency = time.monotonic() - started
+
+        assert submitted.status_code == 200
+        assert submitted.json()["feedbackStatus"] == "pending"
+        assert submit_latency < LLM_DELAY, "submit waited for the question being generated"
+
+        generated = await generate
+        await asyncio.gather(*main.feedback_jobs)
+        elapsed = time.monotonic() - started
+
+    assert generated.status_code == 200
+    assert generated.json()["name"] == QUESTION.name
+    assert attempt.feedback_status == "ready"
+    assert attempt.feedback == FEEDBACK
+    assert slow_llm.max_active == 2, "the question and feedback LLM calls did not overlap"
+    assert elapsed < 2 * LLM_DELAY
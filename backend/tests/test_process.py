@@ -0,0 +1,95 @@
+import shutil
+import subprocess
+
+import pytest
+
+from execution.launcher import launcher_path
+from execution.process import run_process
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None, reason="gcc is not installed")
+
+# Allocates and touches argv[1] MB, then prints "ok"
+ALLOCATE = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+int main(int argc, char **argv) {
+    size_t size = (size_t)atol(argv[1]) << 20;
+    char *memory = malloc(size);
+    if (memory == NULL) {
+        return 1;
+    }
+    memset(memory, 1, size);
+    puts("ok");
+    return 0;
+}
+"""
+
+def compile_c(tmp_path, source: str) -> str:
+    (tmp_path / "main.c").write_text(source)
+    program = str(tmp_path / "program")
+    subprocess.run(["gcc", "main.c", "-o", program], cwd=tmp_path, check=True)
+    return program
+
+@pytest.fixture
+def server_ballast():
+    # Raise this process's own peak well above the programs', as a real server's is
+    ballast = bytearray(200 << 20)
+    ballast[::4096] = b"\1" * len(ballast[::4096])
+    yield
+    del ballast
+
+@pytest.mark.parametrize("megabytes", [1, 20])
+def test_peak_memory_is_the_programs_own(tmp_path, server_ballast, megabytes):
+    program = compile_c(tmp_path, ALLOCATE)
+    process = run_process([program, str(megabytes)], 10)
+
+    assert process.stdout.strip() == "ok"
+    peak = process.usage.max_rss_kb
+    if launcher_path() is None:
+        # Without the launcher an unknown peak is acceptable, a wrong one is not
+        assert peak is None or megabytes * 1024 <= peak < megabytes * 1024 + 8 * 1024
+    else:
+        assert megabytes * 1024 <= peak < megabytes * 1024 + 8 * 1024
+
+STATIC_ARRAY = """
+#include <stdio.h>
+long numbers[50000000];  /* 400 MB of static data */
+int main(void) {
+    for (long i = 0; i < 50000000; i += 512) {
+        numbers[i] = i;
+    }
+    puts("ok");
+    return 0;
+}
+"""
+
+def test_memory_limit_covers_static_data(tmp_path):
+    program = compile_c(tmp_path, STATIC_ARRAY)
+    process = run_process([program], 10, memory_limit_mb=64)
+
+    assert process.returncode != 0
+    assert process.stdout == ""
+
+def test_memory_limit_covers_allocation_at_startup(tmp_path):
+    program = compile_c(tmp_path, ALLOCATE)
+    process = run_process([program, "400"], 10, memory_limit_mb=64)
+
+    # malloc returned NULL: the limit was in force before main started
+    assert process.returncode == 1
+    assert process.stdout == ""
+    assert process.memory_limit_mb == 64
+
+def test_memory_limit_allows_smaller_allocations(tmp_path):
+    program = compile_c(tmp_path, ALLOCATE)
+    process = run_process([program, "16"], 10, memory_limit_mb=64)
+
+    assert process.returncode == 0
+    assert process.stdout.strip() == "ok"
+
+def test_cpu_limit_stops_busy_loop(tmp_path):
+    program = compile_c(tmp_path, "int main(void) { for (;;); }")
+    process = run_process([program], 10, cpu_limit=1)
+
+    assert process.returncode < 0
+    assert process.usage.wall_time < 5
@@ -0,0 +1,45 @@
+from question_index import PastQuestion, QuestionIndex
+
+def past(question_id, name, topics, language="ocaml", difficulty="easy", text=""):
+    return PastQuestion(question_id, name, text, language, difficulty, topics)
+
+CANDIDATES = [
+    past(1, "Reverse a list", ["lists"]),
+    past(2, "Shortest path in a graph", ["graphs"], difficulty="hard"),
+    past(3, "Sum of a list", ["lists"]),
+    past(4, "Depth-first search", ["graphs", "recursion"], difficulty="hard"),
+    past(5, "Fibonacci numbers", ["recursion"]),
+]
+
+def test_few_candidates_are_all_returned():
+    index = QuestionIndex()
+    assert index.most_similar(CANDIDATES[:2], "ocaml", "easy", ["lists"], k=5) == ["Reverse a list", "Shortest path in a graph"]
+
+def test_most_similar_questions_are_picked():
+    index = QuestionIndex()
+    assert set(index.most_similar(CANDIDATES, "ocaml", "hard", ["graphs"], k=2)) == {"Depth-first search", "Shortest path in a graph"}
+    assert set(index.most_similar(CANDIDATES, "ocaml", "easy", ["lists"], k=2)) == {"Reverse a list", "Sum of a list"}
+
+def test_ties_go_to_the_most_recent_question():
+    index = QuestionIndex()
+    same = [past(question_id, f"Question {question_id}", ["lists"]) for question_id in range(1, 5)]
+    assert index.most_similar(same, "ocaml", "easy", ["lists"], k=2) == ["Question 4", "Question 3"]
+
+def test_re_adding_a_question_replaces_it():
+    index = QuestionIndex()
+    index.add(1, "Reverse a list", topics=["lists"])
+    terms = index.stats()["terms"]
+    index.add(1, "Reverse a list", topics=["lists"])
+    assert index.stats() == {"documents": 1, "terms": terms, "max_documents": index.max_docs}
+
+def test_least_recently_used_questions_are_dropped():
+    index = QuestionIndex(max_docs=2)
+    index.add(1, "Reverse a list", topics=["lists"])
+    index.add(2, "Shortest path", topics=["graphs"])
+    index.add(3, "Fibonacci numbers", topics=["recursion"])
+    assert index.stats()["documents"] == 2
+    # Only the dropped question's terms are forgotten
+    index_without_first = QuestionIndex()
+    index_without_first.add(2, "Shortest path", topics=["graphs"])
+    index_without_first.add(3, "Fibonacci numbers", topics=["recursion"])
+    assert index.stats()["terms"] == index_without_first.stats()["terms"]
@@ -0,0 +1,52 @@
+from execution import result_cache as result_cache_module
+from execution.process import ProcessResult, Usage
+from execution.result_cache import ResultCache, deterministic
+from execution.runner import ProgrammingLanguage
+
+def run(stdout="3\n"):
+    return ProcessResult(["./main"], 0, stdout=stdout, stderr="", usage=Usage(0.001, 0.001, 0.0))
+
+def test_stored_run_is_served_until_it_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache_module.time, "monotonic", lambda: now[0])
+    cache = ResultCache(max_entries=10, ttl=60)
+    key = ResultCache.key(ProgrammingLanguage.C, "int main() {}", "./main")
+
+    assert cache.get(key) is None
+    cache.put(key, run())
+    assert cache.get(key).stdout == "3\n"
+
+    now[0] += 61
+    assert cache.get(key) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"], cache.stats()["entries"]) == (1, 2, 0)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.put("a", run("a"))
+    cache.put("b", run("b"))
+    cache.get("a")
+    cache.put("c", run("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").stdout == "a"
+    assert cache.get("c").stdout == "c"
+    assert cache.stats()["evictions"] == 1
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_entries=10, ttl=0)
+    cache.put("a", run())
+    assert cache.get("a") is None
+
+def test_key_covers_language_source_and_input():
+    key = ResultCache.key(ProgrammingLanguage.C, "int main() {}", "./main 1")
+    assert key == ResultCache.key(ProgrammingLanguage.C, "int main() {}", "./main 1")
+    assert key != ResultCache.key(ProgrammingLanguage.C, "int main() {}", "./main 2")
+    assert key != ResultCache.key(ProgrammingLanguage.C, "int main() { }", "./main 1")
+    assert key != ResultCache.key(ProgrammingLanguage.JAVA, "int main() {}", "./main 1")
+
+def test_nondeterministic_submissions_are_recognized():
+    assert deterministic(ProgrammingLanguage.C, "int main() { return 0; }")
+    assert not deterministic(ProgrammingLanguage.C, "int main() { srand(time(NULL)); return rand(); }")
+    assert not deterministic(ProgrammingLanguage.JAVA, "int x = new Random().nextInt();")
+    assert not deterministic(ProgrammingLanguage.OCAML, "let () = print_int (Random.int 10)")
+    assert deterministic(ProgrammingLanguage.OCAML, "let () = print_int 42")
@@ -0,0 +1,128 @@
+import asyncio
+import shutil
+import threading
+import time
+import uuid
+
+import httpx
+import pytest
+
+import main
+import models
+from execution.process import ProcessResult, Usage
+from execution.result_cache import ResultCache, result_cache
+from execution.runner import ProgrammingLanguage
+from execution.scheduler import SchedulerRejected, scheduler
+
+pytestmark = pytest.mark.anyio
+
+SLOW_SECONDS = 2
+
+SLOW_PROGRAM = """
+#include <stdio.h>
+#include <unistd.h>
+int main() {
+    sleep(%d);
+    printf("done\\n");
+    return 0;
+}
+/* %s */
+"""
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="gcc is not installed")
+async def test_event_loop_stays_responsive_during_slow_run(fake_db, auth_headers):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        run = asyncio.create_task(client.post("/api/run_tests", headers=auth_headers, json={
+            "programming_language": "c",
+            # Unique source, so neither the artifact nor the result cache can answer it
+            "code": SLOW_PROGRAM % (SLOW_SECONDS, uuid.uuid4()),
+            "question": {
+                "name": "Slow",
+                "text": "Sleep, then print done",
+                "hint": "",
+                "testCases": [{"input": "./main", "expectedOutput": "done"}]
+            }
+        }))
+        # Let the run get past compilation and into the sleeping program
+        await asyncio.sleep(0.5)
+
+        started = time.monotonic()
+        metrics = await client.get("/api/metrics", headers=auth_headers)
+        latency = time.monotonic() - started
+
+        assert metrics.status_code == 200
+        assert not run.done(), "the slow run finished before the trivial request was made"
+        assert latency < 0.5, f"trivial request took {latency:.2f}s while a program was running"
+
+        response = await run
+        assert response.status_code == 200
+        assert response.json()["results"][0]["actualOutput"].strip() == "done"
+
+async def test_cached_rerun_skips_the_scheduler(fake_db, auth_headers, monkeypatch):
+    code = f'#include <stdio.h>\nint main() {{ puts("3"); return 0; }} /* {uuid.uuid4()} */'
+    result_cache.put(
+        ResultCache.key(ProgrammingLanguage.C, code, "./main"),
+        ProcessResult(["./main"], 0, stdout="3\n", stderr="", usage=Usage(0.001, 0.001, 0.0))
+    )
+
+    def full(user_id):
+        raise SchedulerRejected(503, "Code execution is busy, please try again shortly", 5)
+    monkeypatch.setattr(scheduler, "check_admission", full)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/run_tests", headers=auth_headers, json={
+            "programming_language": "c",
+            "code": code,
+            "question": {
+                "name": "Three",
+                "text": "Print 3",
+                "hint": "",
+                "testCases": [{"input": "./main", "expectedOutput": "3"}]
+            }
+        })
+
+    assert response.status_code == 200
+    result = response.json()["results"][0]
+    assert result["cached"] is True
+    assert result["verdict"] == "OK"
+
+async def test_disconnect_during_compilation_releases_the_build(monkeypatch):
+    building = threading.Event()
+    finish_build = threading.Event()
+    cleaned_up = threading.Event()
+
+    class SlowRunner:
+        compile_usage = None
+
+        def __init__(self, language, code):
+            pass
+
+        def prepare(self):
+            building.set()
+            finish_build.wait(5)
+
+        def cleanup(self):
+            cleaned_up.set()
+
+    monkeypatch.setattr(main, "CodeRunner", SlowRunner)
+    request = models.RunTestsRequest(programming_language="c", code=f"/* {uuid.uuid4()} */")
+    stream = main.stream_test_results(request, [models.TestCase(input="./main", expectedOutput="")], "user")
+
+    # The client goes away while the submission is still compiling
+    first_event = asyncio.ensure_future(stream.__anext__())
+    assert await asyncio.to_thread(building.wait, 5)
+    first_event.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first_event
+
+    assert not cleaned_up.is_set(), "the build was released while it was still being compiled"
+    finish_build.set()
+    assert await asyncio.to_thread(cleaned_up.wait, 5), "the build was never released"
+
+async def test_metrics_require_a_token():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/metrics")
+    assert response.status_code == 401
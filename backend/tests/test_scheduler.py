@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from execution.scheduler import ExecutionScheduler, SchedulerRejected
+
+pytestmark = pytest.mark.anyio
+
+async def hold(scheduler, user_id, release: asyncio.Event, admitted: list):
+    async with scheduler.slot(user_id):
+        admitted.append(user_id)
+        await release.wait()
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def test_user_over_the_per_user_limit_gets_429_with_retry_after():
+    scheduler = ExecutionScheduler(max_running=4, max_queued=4, max_per_user=1)
+    async with scheduler.slot("alice"):
+        with pytest.raises(SchedulerRejected) as rejected:
+            async with scheduler.slot("alice"):
+                pass
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after >= 1
+
+        # Other users are unaffected
+        async with scheduler.slot("bob"):
+            pass
+    assert scheduler.stats()["rejected"] == 1
+
+async def test_full_queue_gets_503():
+    scheduler = ExecutionScheduler(max_running=1, max_queued=1, max_per_user=4)
+    release = asyncio.Event()
+    admitted = []
+    running = asyncio.create_task(hold(scheduler, "alice", release, admitted))
+    queued = asyncio.create_task(hold(scheduler, "bob", release, admitted))
+    await settle()
+    assert scheduler.stats()["queue_depth"] == 1
+
+    with pytest.raises(SchedulerRejected) as rejected:
+        async with scheduler.slot("carol"):
+            pass
+    assert rejected.value.status_code == 503
+    assert rejected.value.retry_after >= 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert admitted == ["alice", "bob"]
+
+async def test_waiting_longer_than_max_wait_gets_503():
+    scheduler = ExecutionScheduler(max_running=1, max_queued=4, max_per_user=4, max_wait=0.05)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(scheduler, "alice", release, []))
+    await settle()
+
+    with pytest.raises(SchedulerRejected) as rejected:
+        async with scheduler.slot("bob"):
+            pass
+    assert rejected.value.status_code == 503
+    assert scheduler.stats()["queue_depth"] == 0
+
+    release.set()
+    await running
+
+async def test_waiting_users_are_served_round_robin():
+    scheduler = ExecutionScheduler(max_running=1, max_queued=8, max_per_user=8)
+    release = asyncio.Event()
+    admitted = []
+    tasks = []
+    for user_id in ["alice", "alice", "alice", "bob"]:
+        tasks.append(asyncio.create_task(hold(scheduler, user_id, release, admitted)))
+        await settle()
+
+    release.set()
+    await asyncio.gather(*tasks)
+    # Bob's single submission does not wait behind all of Alice's
+    assert admitted == ["alice", "alice", "bob", "alice"]
+
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = ExecutionScheduler(max_running=1, max_queued=4, max_per_user=4)
+    release = asyncio.Event()
+    admitted = []
+    running = asyncio.create_task(hold(scheduler, "alice", release, admitted))
+    await settle()
+    waiting = asyncio.create_task(hold(scheduler, "bob", release, admitted))
+    await settle()
+
+    waiting.cancel()
+    await settle()
+    assert scheduler.stats()["queue_depth"] == 0
+
+    release.set()
+    await running
+    async with scheduler.slot("bob"):
+        pass
+    assert admitted == ["alice"]
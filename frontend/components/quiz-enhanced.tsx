@@ -1,6 +1,6 @@
 'use client'
 
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { GoogleLogin, GoogleOAuthProvider } from '@react-oauth/google'
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
@@ -55,6 +55,13 @@ interface Feedback {
   weaknesses: string[]
 }
 
+interface FeedbackStatus {
+  status: 'pending' | 'running' | 'ready' | 'failed'
+  attempts: number
+  feedback: Feedback
+  error?: string
+}
+
 interface QuestionParams {
   difficulty: string
   topics: string[]
@@ -462,6 +469,8 @@ export default function QuizEnhanced() {
   const [isSidebarVisible, setIsSidebarVisible] = useState(true)
   const [initialQuestionLoaded, setInitialQuestionLoaded] = useState(false)
   const [selectedLanguage, setSelectedLanguage] = useState('java');
+  // Question whose feedback is being polled for, so stale results are dropped
+  const pollingQuestionId = useRef<number | undefined>(undefined);
 
   useEffect(() => {
     const validateExistingSession = async () => {
@@ -547,6 +556,7 @@ export default function QuizEnhanced() {
 
   const handleGenerateQuestion = async (settings?: QuestionParams) => {
     if (!token) return;
+    pollingQuestionId.current = undefined;
 
     setIsGeneratingQuestion(true);
     setError(null);
@@ -589,7 +599,7 @@ export default function QuizEnhanced() {
     try {
       const response = await apiCall('run_tests', 'POST', {
         code: code,
-        question: question,
+        question_id: question.id,
         programming_language: selectedLanguage
       }, token);
       
@@ -609,36 +619,65 @@ export default function QuizEnhanced() {
     setError(null);
 
     try {
-      const response = await apiCall('run_tests', 'POST', {
+      // The server judges the submission and returns before feedback is ready
+      const result = await apiCall('submit', 'POST', {
         code: code,
-        question: question,
-        programming_language: selectedLanguage,
+        question_id: question.id,
+        programming_language: selectedLanguage
       }, token);
       
-      setTestResults(response.results);
+      setTestResults(result.testResults);
+      // Feedback comes back right away when the same code was submitted before
+      if (result.feedback) {
+        setFeedback(result.feedback);
+        pollingQuestionId.current = undefined;
+        const updatedSolvedQuestions = await apiCall('solved_questions', 'GET', null, token);
+        setSolvedQuestions(updatedSolvedQuestions);
+        return;
+      }
+      setFeedback({
+        isCorrect: result.isCorrect,
+        feedback: 'Generating feedback using GenAI...',
+        strengths: [],
+        weaknesses: []
+      });
     } catch (error) {
       const apiError = error as ApiError;
-      setError(apiError.message || 'Failed to run test cases. Please try again.');
+      setError(apiError.message || 'Failed to submit answer. Please try again.');
       return;
+    } finally {
+      setIsSubmitting(false);
     }
 
+    pollFeedback(question.id);
+  }
+
+  const pollFeedback = async (questionId?: number) => {
+    if (questionId === undefined || !token) return;
+    pollingQuestionId.current = questionId;
+
     try {
-      const result = await apiCall('submit', 'POST', {
-        code: code,
-        question: question,
-        test_results: testResults,
-        programming_language: selectedLanguage
-      }, token);
-      
-      setFeedback(result);
-      
+      for (let poll = 0; poll < 120; poll++) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        if (pollingQuestionId.current !== questionId) return;
+
+        const status: FeedbackStatus = await apiCall(`feedback/${questionId}`, 'GET', null, token);
+        if (pollingQuestionId.current !== questionId) return;
+        if (status.status === 'ready') {
+          setFeedback(status.feedback);
+          break;
+        }
+        if (status.status === 'failed') {
+          setError('Failed to generate feedback. Please submit again.');
+          break;
+        }
+      }
+
       const updatedSolvedQuestions = await apiCall('solved_questions', 'GET', null, token);
       setSolvedQuestions(updatedSolvedQuestions);
     } catch (error) {
       const apiError = error as ApiError;
-      setError(apiError.message || 'Failed to submit answer. Please try again.');
-    } finally {
-      setIsSubmitting(false);
+      setError(apiError.message || 'Failed to fetch feedback. Please try again.');
     }
   }
 
@@ -669,6 +708,9 @@ export default function QuizEnhanced() {
   };
 
   const handleSelectSolvedQuestion = (solvedQuestion: SolvedQuestion) => {
+    if (solvedQuestion.question.id !== pollingQuestionId.current) {
+      pollingQuestionId.current = undefined;
+    }
     setQuestion(solvedQuestion.question);
     setCode(solvedQuestion.userCode);
     setFeedback(solvedQuestion.feedback);
@@ -861,7 +903,7 @@ export default function QuizEnhanced() {
       </div>
       <LoadingOverlay 
         isLoading={isGeneratingQuestion || isSubmitting}
-        message={isGeneratingQuestion ? "Generating Question using GenAI..." : "Submitting solution and generating feedback using GenAI..."}
+        message={isGeneratingQuestion ? "Generating Question using GenAI..." : "Submitting solution..."}
       />
     </GoogleOAuthProvider>
   )